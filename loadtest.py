@@ -0,0 +1,491 @@
+"""Load testing for the scheduler without touching the real Supabase project.
+
+Two pieces:
+
+``stub``  A local stand-in for the bit of PostgREST that main.py uses
+          (select, eq/neq/lt/lte/gt/gte filters, limit, insert and update on
+          the 11 tables), backed by
+          an in-memory store seeded with fake data, with optional injected
+          latency and errors.
+``run``   A concurrent-user script that drives a running copy of the app with
+          a mix of student searches, secretary submissions and admin
+          assignments, then prints throughput, p50/p95/p99 latency and error
+          rate per route.
+
+Typical session (three terminals):
+
+    python loadtest.py stub --port 54321 --latency-ms 20
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=stub gunicorn -w 4 main:app
+    python loadtest.py run --target http://127.0.0.1:8000 --users 50 --duration 60
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import operator
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+TABLES = [
+    "Building",
+    "Department",
+    "Course",
+    "Room",
+    "Section",
+    "Equipment Type",
+    "Room Equipment",
+    "Request Equipment",
+    "Room Assignment",
+    "Blackout Hours",
+    "Class Request",
+]
+
+# Columns the database fills in when an insert leaves them out.
+IDENTITY_COLUMNS = {
+    "Room": "room_id",
+    "Section": "section_id",
+    "Equipment Type": "equip_id",
+    "Request Equipment": "request_id",
+    "Room Assignment": "assignment_id",
+    "Class Request": "request_id",
+}
+
+
+# PostgREST filter operators the stand-in understands. Anything else gets a
+# 400 like a real server would, rather than quietly returning every row.
+FILTER_OPERATORS = {
+    "eq": operator.eq,
+    "neq": operator.ne,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+}
+
+
+class MemoryStore:
+    """Thread-safe in-memory tables with just enough PostgREST behaviour."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tables = {name: [] for name in TABLES}
+        self._next_id = defaultdict(lambda: 1)
+
+    def insert(self, table: str, row: dict) -> dict:
+        with self._lock:
+            row = dict(row)
+            id_col = IDENTITY_COLUMNS.get(table)
+            if id_col:
+                if row.get(id_col) is None:
+                    row[id_col] = self._next_id[table]
+                self._next_id[table] = max(self._next_id[table], int(row[id_col]) + 1)
+            self.tables[table].append(row)
+            return dict(row)
+
+    @staticmethod
+    def _compare(op: str, stored, value: str) -> bool:
+        if stored is None:
+            return False
+        # Numbers compare as numbers; ids, names and ISO timestamps as text.
+        try:
+            return FILTER_OPERATORS[op](float(stored), float(value))
+        except (TypeError, ValueError):
+            return FILTER_OPERATORS[op](str(stored), value)
+
+    @classmethod
+    def _matches(cls, row: dict, filters) -> bool:
+        return all(cls._compare(op, row.get(col), value) for col, op, value in filters)
+
+    def select(self, table: str, columns, filters):
+        with self._lock:
+            rows = [r for r in self.tables[table] if self._matches(r, filters)]
+            if columns is None:
+                return [dict(r) for r in rows]
+            return [{c: r.get(c) for c in columns} for r in rows]
+
+    def update(self, table: str, values: dict, filters):
+        with self._lock:
+            updated = []
+            for r in self.tables[table]:
+                if self._matches(r, filters):
+                    r.update(values)
+                    updated.append(dict(r))
+            return updated
+
+    def seed(self, buildings: int = 4, rooms_per_building: int = 10, departments: int = 6,
+             courses_per_department: int = 8, assignments: int = 400, requests: int = 200):
+        rng = random.Random(440)
+        building_ids = [f"B{i}" for i in range(1, buildings + 1)]
+        for b in building_ids:
+            self.insert("Building", {"building_id": b, "name": f"Building {b}"})
+        for b in building_ids:
+            for n in range(1, rooms_per_building + 1):
+                self.insert("Room", {"building_id": b, "room_num": str(100 + n)})
+        for i in range(1, departments + 1):
+            dept_id = f"D{i}"
+            self.insert("Department", {
+                "department_id": dept_id,
+                "name": f"Department {i}",
+                "building_id": rng.choice(building_ids),
+            })
+            for n in range(1, courses_per_department + 1):
+                course_id = f"{dept_id}-{100 + n}"
+                self.insert("Course", {"course_id": course_id, "name": f"Course {course_id}", "department_id": dept_id})
+                self.insert("Section", {"course_id": course_id, "instructor": f"Instructor {n}", "term": "F25"})
+        for name in ("Projector", "Whiteboard", "Microphone"):
+            self.insert("Equipment Type", {"name": name})
+
+        room_count = len(self.tables["Room"])
+        section_count = len(self.tables["Section"])
+        week_start = datetime(2025, 9, 1, 8, 0)
+        for _ in range(assignments):
+            start = week_start + timedelta(days=rng.randrange(5), hours=rng.randrange(10))
+            self.insert("Room Assignment", {
+                "room_id": rng.randrange(1, room_count + 1),
+                "section_id": rng.randrange(1, section_count + 1),
+                "start": start.isoformat(),
+                "end": (start + timedelta(minutes=rng.choice([50, 75, 110]))).isoformat(),
+                "status": "assigned",
+            })
+        for _ in range(requests):
+            start = week_start + timedelta(days=7 + rng.randrange(5), hours=rng.randrange(10))
+            self.insert("Class Request", {
+                "section_id": rng.randrange(1, section_count + 1),
+                "requester": "seed",
+                "requested_start": start.isoformat(timespec='minutes'),
+                "requested_end": (start + timedelta(minutes=75)).isoformat(timespec='minutes'),
+                "preferred_room": None,
+                "status": "pending",
+            })
+
+
+class StubStats:
+    """Counts what the stand-in served, so injected errors can be checked against what the app reported."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.injected_errors = 0
+
+    def count(self, injected: bool):
+        with self._lock:
+            self.requests += 1
+            self.injected_errors += injected
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "injected_errors": self.injected_errors}
+
+
+def make_stub_handler(store: MemoryStore, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                      error_rate: float = 0.0, stats: StubStats = None):
+    stats = stats or StubStats()
+
+    class PostgrestStubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status: int, code: str, message: str):
+            # Same shape as PostgREST, so the client parses the code instead of just the status.
+            return self._send(status, {"code": code, "message": message, "details": None, "hint": None})
+
+        def _parse(self):
+            """Return ``(table, columns, filters, window)``; raise ValueError for what isn't supported."""
+            parsed = urllib.parse.urlsplit(self.path)
+            prefix = "/rest/v1/"
+            if not parsed.path.startswith(prefix):
+                return None, None, None, None
+            table = urllib.parse.unquote(parsed.path[len(prefix):])
+            columns = None
+            filters = []
+            window = {"limit": None, "offset": 0}
+            for name, value in urllib.parse.parse_qsl(parsed.query):
+                if name == "select":
+                    if value.strip() != "*":
+                        columns = [c.strip() for c in value.split(",") if c.strip()]
+                elif name in window:
+                    if not value.isdigit():
+                        raise ValueError(f"{name} must be a non-negative integer, got {value!r}")
+                    window[name] = int(value)
+                else:
+                    op, _, operand = value.partition(".")
+                    if op not in FILTER_OPERATORS:
+                        raise ValueError(f"unsupported filter {name}={value!r}")
+                    filters.append((name, op, operand))
+            return table, columns, filters, window
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"null")
+
+        def _handle(self, method: str):
+            if self.path == "/_stats":
+                return self._send(200, stats.snapshot())
+            delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000.0
+            if delay:
+                time.sleep(delay)
+            body = self._body() if method in ("POST", "PATCH") else None
+            try:
+                table, columns, filters, window = self._parse()
+            except ValueError as e:
+                stats.count(False)
+                return self._error(400, "PGRST100", str(e))
+            if table not in store.tables:
+                stats.count(False)
+                return self._error(404, "42P01", f"relation {table!r} does not exist")
+            if error_rate and random.random() < error_rate:
+                stats.count(True)
+                return self._error(503, "PGRST000", "injected error")
+            stats.count(False)
+
+            if method == "GET":
+                rows = store.select(table, columns, filters)[window["offset"]:]
+                if window["limit"] is not None:
+                    rows = rows[:window["limit"]]
+                return self._send(200, rows)
+            if method == "POST":
+                rows = body if isinstance(body, list) else [body]
+                return self._send(201, [store.insert(table, r) for r in rows])
+            return self._send(200, store.update(table, body or {}, filters))
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PATCH(self):
+            self._handle("PATCH")
+
+    return PostgrestStubHandler
+
+
+def serve_stub(args):
+    store = MemoryStore()
+    store.seed(assignments=args.assignments, requests=args.requests)
+    handler = make_stub_handler(store, args.latency_ms, args.jitter_ms, args.error_rate)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"PostgREST stand-in on http://{args.host}:{server.server_port}")
+    print(f"  SUPABASE_URL=http://{args.host}:{server.server_port} SUPABASE_KEY=stub")
+    print(f"  request and injected error counts at http://{args.host}:{server.server_port}/_stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Time each route on its own instead of including the page it redirects to.
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+# The app rarely answers with a 4xx/5xx: failed actions redirect with ?error=,
+# failed reads fall back to snapshots under this banner or render empty pages.
+STALE_BANNER = "The database is not responding right now"
+NO_RESULTS = "No matching classroom assignments found"
+
+
+class SimulatedUser:
+    def __init__(self, target: str, stub: str, rng: random.Random):
+        self.target = target.rstrip("/")
+        self.stub = stub.rstrip("/") if stub else None
+        self.rng = rng
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _NoRedirect(),
+        )
+        self.role = None
+
+    def _request(self, route: str, path: str, record, data: dict = None, expect_results: bool = False):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        started = time.perf_counter()
+        try:
+            with self.opener.open(self.target + path, data=body, timeout=30) as resp:
+                page = resp.read().decode("utf-8", "replace")
+            ok = STALE_BANNER not in page and not (expect_results and NO_RESULTS in page)
+        except urllib.error.HTTPError as e:
+            # Redirects land here too, since _NoRedirect doesn't follow them.
+            location = urllib.parse.urlsplit(e.headers.get("Location") or "")
+            ok = e.code < 400 and "error" not in urllib.parse.parse_qs(location.query)
+            e.close()
+        except Exception:
+            ok = False
+        record(route, time.perf_counter() - started, ok)
+
+    def _login(self, role: str, record):
+        if self.role != role:
+            self._request("POST /login", "/login", record, {"role": role, "password": role})
+            self.role = role
+
+    def _pending_request_id(self):
+        if not self.stub:
+            return self.rng.randint(1, 200)
+        url = self.stub + "/rest/v1/Class%20Request?select=request_id&status=eq.pending"
+        try:
+            with urllib.request.urlopen(url, timeout=10) as resp:
+                rows = json.loads(resp.read())
+        except Exception:
+            return None
+        return self.rng.choice(rows)["request_id"] if rows else None
+
+    def student(self, record):
+        params = {}
+        choice = self.rng.random()
+        if choice < 0.3:
+            params["building_id"] = f"B{self.rng.randint(1, 4)}"
+        elif choice < 0.6:
+            params["dept_id"] = f"D{self.rng.randint(1, 6)}"
+        elif choice < 0.8:
+            params["time"] = f"{self.rng.randint(8, 17):02d}:00"
+        query = ("?" + urllib.parse.urlencode(params)) if params else ""
+        # The seeded data always has assignments, so an unfiltered search should never come back empty.
+        self._request("GET /student", "/student" + query, record, expect_results=not params)
+
+    def secretary(self, record):
+        self._login("secretary", record)
+        self._request("GET /secretary", "/secretary", record)
+        start = datetime(2025, 9, 15, 8, 0) + timedelta(days=self.rng.randrange(5), hours=self.rng.randrange(10))
+        self._request("POST /secretary/request", "/secretary/request", record, {
+            "section_id": str(self.rng.randint(1, 48)),
+            "requester": "loadtest",
+            "requested_start": start.isoformat(timespec="minutes"),
+            "requested_end": (start + timedelta(minutes=75)).isoformat(timespec="minutes"),
+            "preferred_room": str(self.rng.randint(1, 40)),
+        })
+
+    def admin(self, record):
+        self._login("admin", record)
+        self._request("GET /admin", "/admin", record)
+        request_id = self._pending_request_id()
+        if request_id is not None:
+            self._request("POST /admin/assign", f"/admin/assign/{request_id}", record, {
+                "room_id": str(self.rng.randint(1, 40)),
+            })
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _stub_stats(stub: str):
+    if not stub:
+        return None
+    try:
+        with urllib.request.urlopen(stub.rstrip("/") + "/_stats", timeout=10) as resp:
+            return json.loads(resp.read())
+    except Exception:
+        return None
+
+
+def run_load(args):
+    mix = {}
+    for part in args.mix.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    scenarios = [name for name in mix if name in ("student", "secretary", "admin")]
+    weights = [mix[name] for name in scenarios]
+
+    lock = threading.Lock()
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+
+    def record(route: str, seconds: float, ok: bool):
+        with lock:
+            samples[route].append(seconds)
+            if not ok:
+                errors[route] += 1
+
+    deadline = time.monotonic() + args.duration
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        user = SimulatedUser(args.target, args.stub, rng)
+        while time.monotonic() < deadline:
+            getattr(user, rng.choices(scenarios, weights)[0])(record)
+            if args.think_ms:
+                time.sleep(rng.uniform(0, args.think_ms) / 1000.0)
+
+    stub_before = _stub_stats(args.stub)
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.users)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    print(f"{args.users} users for {elapsed:.1f}s against {args.target}")
+    print(f"{'route':<26}{'count':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}")
+    for route in sorted(samples):
+        values = sorted(samples[route])
+        count = len(values)
+        print(
+            f"{route:<26}{count:>8}{count / elapsed:>9.1f}"
+            f"{_percentile(values, 50) * 1000:>9.1f}"
+            f"{_percentile(values, 95) * 1000:>9.1f}"
+            f"{_percentile(values, 99) * 1000:>9.1f}"
+            f"{errors[route] / count:>8.1%} "
+        )
+
+    stub_after = _stub_stats(args.stub)
+    if stub_before and stub_after:
+        backend = stub_after["requests"] - stub_before["requests"]
+        injected = stub_after["injected_errors"] - stub_before["injected_errors"]
+        print(f"backend: {backend} requests, {injected} injected errors"
+              f" ({injected / backend if backend else 0:.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    stub = sub.add_parser("stub", help="run the local PostgREST stand-in")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=54321)
+    stub.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every request")
+    stub.add_argument("--jitter-ms", type=float, default=0.0, help="random +/- spread on the delay")
+    stub.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    stub.add_argument("--assignments", type=int, default=400, help="room assignments to seed")
+    stub.add_argument("--requests", type=int, default=200, help="pending class requests to seed")
+    stub.set_defaults(func=serve_stub)
+
+    run = sub.add_parser("run", help="drive a running app with simulated users")
+    run.add_argument("--target", default="http://127.0.0.1:5000", help="base URL of the app")
+    run.add_argument("--stub", default="http://127.0.0.1:54321",
+                     help="stand-in URL, used to pick pending requests for admins")
+    run.add_argument("--users", type=int, default=20)
+    run.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    run.add_argument("--think-ms", type=float, default=0.0, help="max random pause between actions")
+    run.add_argument("--mix", default="student=8,secretary=1,admin=1",
+                     help="scenario weights, e.g. student=8,secretary=1,admin=1")
+    run.set_defaults(func=run_load)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
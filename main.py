@@ -1,40 +1,1403 @@
+import abc
+import hashlib
+import json
 import os
-from datetime import datetime
-from supabase import create_client, Client
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 import dotenv
-from flask import Flask, render_template, request, session, redirect, url_for
+from flask import Flask, render_template, request, session, redirect, url_for, jsonify, g, has_request_context, abort, send_from_directory
+from jinja2 import FileSystemBytecodeCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshot writes still go through os.replace, just unlocked.
+    fcntl = None
 
 dotenv.load_dotenv()
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "class-demo-secret-key")
 
+# Compiled templates are written here so a fresh worker can skip compiling them.
+# Run `flask --app main warm-templates` at deploy to fill it ahead of traffic.
+TEMPLATE_CACHE_DIR = os.environ.get(
+    "TEMPLATE_CACHE_DIR", os.path.join(app.root_path, ".template_cache")
+)
+try:
+    os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    if not os.access(TEMPLATE_CACHE_DIR, os.W_OK):
+        raise PermissionError(f"{TEMPLATE_CACHE_DIR} is not writable")
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+except OSError as e:
+    # Read-only deploys still start; templates just compile in memory.
+    print("Template bytecode cache disabled:", e)
+
+
+def warm_template_cache() -> int:
+    """Compile every template into the bytecode cache and return how many there were."""
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+@app.cli.command('warm-templates')
+def warm_templates_command():
+    """Precompile all templates into the bytecode cache."""
+    print(f"Compiled {warm_template_cache()} templates into {TEMPLATE_CACHE_DIR}")
+
+
+@lru_cache(maxsize=4096)
+def _format_pretty_datetime(text: str) -> str:
+    try:
+        cleaned = text.replace(' ', 'T')
+        if len(cleaned) > 19:
+            cleaned = cleaned[:19]
+        dt = datetime.fromisoformat(cleaned)
+        return dt.strftime('%b %d, %Y %I:%M %p')
+    except Exception:
+        return text
+
 
 @app.template_filter('pretty_datetime')
 def pretty_datetime(value: str) -> str:
     """Format ISO-ish datetime strings into a friendlier display for templates.
 
-    Keeps original value on parse errors so we never break pages.
+    Keeps original value on parse errors so we never break pages. The same
+    timestamps show up on every row, so the formatted strings are memoized.
     """
     if not value:
         return ''
+    return _format_pretty_datetime(str(value))
+
+
+SUPABASE_TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", "5"))
+SUPABASE_RETRIES = int(os.environ.get("SUPABASE_RETRIES", "2"))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Supabase while the circuit breaker is open."""
+
+
+# PostgREST connection errors and the SQLSTATE classes that mean the database
+# itself is unavailable or overloaded, rather than the query being wrong.
+_TRANSIENT_PGRST_CODES = {'PGRST000', 'PGRST001', 'PGRST002', 'PGRST003'}
+_TRANSIENT_SQLSTATE_CLASSES = ('08', '53', '57', '58', 'XX')
+
+
+def is_transient_error(exc: Exception) -> bool:
+    """True for timeouts, transport errors and 5xx-style backend failures.
+
+    Deterministic errors (unknown table or column, constraint violations and
+    other 4xx responses) will fail the same way every time, so they are not
+    retried and don't count against the circuit breaker.
+    """
+    import httpx
+    from postgrest.exceptions import APIError
+
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError)):
+        return True
+    if isinstance(exc, APIError):
+        code = exc.code
+        if code is None:
+            return True
+        if isinstance(code, int) or (str(code).isdigit() and len(str(code)) == 3):
+            return int(code) >= 500
+        code = str(code)
+        return code in _TRANSIENT_PGRST_CODES or code.startswith(_TRANSIENT_SQLSTATE_CLASSES)
+    return False
+
+
+class CircuitBreaker:
+    """Stops calling the backend after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    calls fail fast. Once ``reset_timeout`` seconds pass a single probe call
+    is let through; success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def seconds_until_probe(self) -> float:
+        """How long until a call will be let through (0 if one would be now)."""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class ResilientReads:
+    """Retries, circuit breaking and last-good snapshots for Supabase calls.
+
+    Reads are retried with jittered backoff. Every successful read is kept as
+    the last good snapshot for its query; when the backend fails or the
+    breaker is open, that snapshot is returned along with the time it was
+    taken, and the query is queued for a background refresh that waits for
+    the breaker to let a probe through. Writes only go through the breaker,
+    since retrying an insert could duplicate it. Only transient failures
+    (see ``is_transient_error``) are retried, counted by the breaker or
+    answered from a snapshot.
+    """
+
+    def __init__(self, retries: int = SUPABASE_RETRIES, backoff: float = 0.2, max_snapshots: int = 1024):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_snapshots = max_snapshots
+        self.breaker = CircuitBreaker()
+        self._lock = threading.Lock()
+        self._snapshots = OrderedDict()
+        # key -> read function, for snapshots waiting to be refreshed
+        self._pending = OrderedDict()
+        self._revalidation_scheduled = False
+        self.min_revalidation_delay = 1.0
+        self.stats = {'retries': 0, 'failures': 0, 'stale_served': 0, 'revalidations': 0}
+
+    def _call(self, fn):
+        if not self.breaker.allow():
+            raise CircuitOpenError('Supabase circuit breaker is open')
+        try:
+            result = fn()
+        except Exception as e:
+            if is_transient_error(e):
+                self.breaker.record_failure()
+            else:
+                # The backend answered, it just rejected the query.
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _call_with_retries(self, fn):
+        attempt = 0
+        while True:
+            try:
+                return self._call(fn)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                if attempt >= self.retries or not is_transient_error(e):
+                    raise
+                attempt += 1
+                with self._lock:
+                    self.stats['retries'] += 1
+                # Full jitter so workers that failed together don't retry together.
+                time.sleep(random.uniform(0, self.backoff * (2 ** (attempt - 1))))
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._snapshots[key] = (result, datetime.now())
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+
+    def _revalidate(self, key, fn):
+        """Queue a stale key for refresh and make sure a refresh is scheduled."""
+        with self._lock:
+            self._pending[key] = fn
+            if self._revalidation_scheduled:
+                return
+            self._revalidation_scheduled = True
+        self._schedule_revalidation(self.breaker.seconds_until_probe())
+
+    def _schedule_revalidation(self, delay: float):
+        timer = threading.Timer(delay, self._drain_pending)
+        timer.daemon = True
+        timer.start()
+
+    def _drain_pending(self):
+        # One timer at a time refreshes the queued keys. While the breaker is
+        # open it just waits for the half-open window instead of calling.
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._revalidation_scheduled = False
+                    return
+                key, fn = next(iter(self._pending.items()))
+            try:
+                with self._lock:
+                    self.stats['revalidations'] += 1
+                self._remember(key, self._call_with_retries(fn))
+            except Exception as e:
+                if isinstance(e, CircuitOpenError) or is_transient_error(e):
+                    self._schedule_revalidation(max(self.breaker.seconds_until_probe(), self.min_revalidation_delay))
+                    return
+                print('Background revalidation failed:', key[0], e)
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def read(self, key, fn, allow_stale: bool = True):
+        """Run a read and return ``(result, stale_since)``.
+
+        ``stale_since`` is None for a fresh result, or the time the snapshot
+        being returned was taken. With ``allow_stale=False`` a failed read
+        raises instead of falling back to a snapshot.
+        """
+        try:
+            result = self._call_with_retries(fn)
+        except Exception as e:
+            if not allow_stale or (not isinstance(e, CircuitOpenError) and not is_transient_error(e)):
+                raise
+            with self._lock:
+                self.stats['failures'] += 1
+                snapshot = self._snapshots.get(key)
+                if snapshot is not None:
+                    self.stats['stale_served'] += 1
+            if snapshot is None:
+                raise
+            self._revalidate(key, fn)
+            return snapshot
+        self._remember(key, result)
+        with self._lock:
+            self._pending.pop(key, None)
+        return result, None
+
+    def write(self, fn):
+        return self._call(fn)
+
+
+class SharedCache(abc.ABC):
+    """Interface for a cache that every worker on a host (or cluster) reads.
+
+    Entries are stored under a per-table version token. Writing to a table
+    bumps its token, which is the invalidation broadcast: every worker reads
+    the current token before looking anything up, so entries written under
+    an older token simply stop being found. A networked backend only needs
+    to implement these four methods and be added to ``SHARED_CACHE_BACKENDS``.
+    """
+
+    @abc.abstractmethod
+    def get_version(self, table: str) -> str:
+        """Return the current version token for ``table``."""
+
+    @abc.abstractmethod
+    def bump_version(self, table: str) -> str:
+        """Give ``table`` a new version token and return it."""
+
+    @abc.abstractmethod
+    def get(self, table: str, version: str, key: str):
+        """Return the value stored under ``key`` for this version, or None."""
+
+    @abc.abstractmethod
+    def set(self, table: str, version: str, key: str, value):
+        """Store a JSON-serializable ``value`` under ``key`` for this version."""
+
+
+class NullSharedCache(SharedCache):
+    """Backend that stores nothing, for turning the shared cache off."""
+
+    def get_version(self, table: str) -> str:
+        return ''
+
+    def bump_version(self, table: str) -> str:
+        return ''
+
+    def get(self, table: str, version: str, key: str):
+        return None
+
+    def set(self, table: str, version: str, key: str, value):
+        pass
+
+
+class FileSharedCache(SharedCache):
+    """Shared cache kept as JSON files in a directory all workers can see.
+
+    Files are written to a temp name and renamed into place so readers never
+    see a partial entry. Hot files stay in the OS page cache, which is shared
+    between processes, so adding workers doesn't add copies of the data.
+    Version tokens are unique per bump (not counters), so two workers bumping
+    at once can't both land on the same token.
+    """
+
+    def __init__(self, directory: str, ttl: float = 300.0):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _slug(table: str) -> str:
+        return table.replace(' ', '_')
+
+    def _write_atomic(self, path: str, text: str):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_version(self, table: str) -> str:
+        path = os.path.join(self.directory, f"{self._slug(table)}.version")
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return self.bump_version(table)
+
+    def bump_version(self, table: str) -> str:
+        slug = self._slug(table)
+        version = f"{time.time_ns():x}-{os.getpid()}"
+        self._write_atomic(os.path.join(self.directory, f"{slug}.version"), version)
+        # Entries under older tokens can never be read again; clear them out.
+        for name in os.listdir(self.directory):
+            if name.startswith(slug + '.') and name.endswith('.json') and not name.startswith(f"{slug}.{version}."):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        return version
+
+    def _entry_path(self, table: str, version: str, key: str) -> str:
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{self._slug(table)}.{version}.{digest}.json")
+
+    def get(self, table: str, version: str, key: str):
+        try:
+            with open(self._entry_path(table, version, key)) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        # The TTL covers edits made outside the app, which don't bump versions.
+        if time.time() - entry.get('stored_at', 0) > self.ttl:
+            return None
+        return entry.get('value')
+
+    def set(self, table: str, version: str, key: str, value):
+        entry = {'stored_at': time.time(), 'value': value}
+        self._write_atomic(self._entry_path(table, version, key), json.dumps(entry))
+
+
+SHARED_CACHE_BACKENDS = {
+    'file': lambda: FileSharedCache(
+        os.environ.get(
+            "SHARED_CACHE_DIR",
+            os.path.join(tempfile.gettempdir(), "class-scheduler-cache"),
+        ),
+        ttl=float(os.environ.get("SHARED_CACHE_TTL", "300")),
+    ),
+    'none': NullSharedCache,
+}
+
+# Tables the schedule pages and timetable lookups read on every request.
+SHARED_CACHE_TABLES = {'Building', 'Room', 'Department', 'Section', 'Course', 'Room Assignment'}
+
+
+def make_shared_cache() -> SharedCache:
+    backend = os.environ.get("SHARED_CACHE_BACKEND", "file")
     try:
-        text = str(value).replace(' ', 'T')
-        if len(text) > 19:
-            text = text[:19]
-        dt = datetime.fromisoformat(text)
-        return dt.strftime('%b %d, %Y %I:%M %p')
-    except Exception:
-        return str(value)
+        return SHARED_CACHE_BACKENDS[backend]()
+    except Exception as e:
+        print(f"Error setting up shared cache backend {backend!r}, running without it:", e)
+        return NullSharedCache()
 
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_KEY")
 
-try:
-    supabase: Client = create_client(url, key)
-except Exception as e:
-    print("Error creating Supabase client:", e)
-    exit(1)
+class CachedResponse:
+    """Stands in for a PostgREST response when rows come from the shared cache."""
+
+    def __init__(self, data):
+        self.data = data
+
+
+class LazySupabase:
+    """Builds the Supabase client on first use instead of at import.
+
+    Importing the supabase package and opening its HTTP session is the slowest
+    part of starting a worker, so that cost moves to the first request. If the
+    client can't be built the error is raised at the call site (where routes
+    already catch it) and retried on the next call instead of killing the
+    process.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+        self.last_error = None
+        self.single_flight = SingleFlight()
+        self.resilience = ResilientReads()
+        self.shared_cache = make_shared_cache()
+
+    def _get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from supabase import create_client, ClientOptions
+                    try:
+                        self._client = create_client(
+                            os.environ.get("SUPABASE_URL"),
+                            os.environ.get("SUPABASE_KEY"),
+                            options=ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT),
+                        )
+                        self.last_error = None
+                    except Exception as e:
+                        self.last_error = e
+                        print("Error creating Supabase client:", e)
+                        raise
+        return self._client
+
+    def ready(self) -> bool:
+        """Report whether Supabase can actually be queried right now.
+
+        Building the client makes no network call, so this also runs a
+        one-row query straight on the client (no breaker, cache or snapshot
+        in the way) to catch a bad key or an unreachable backend.
+        """
+        try:
+            self._get().table('Building').select('building_id').limit(1).execute()
+            self.last_error = None
+            return True
+        except Exception as e:
+            self.last_error = e
+            return False
+
+    def table(self, table_name: str):
+        return TableQuery(self._get(), table_name, self)
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Lets concurrent identical reads share one backend call.
+
+    The first caller for a key runs the call; anyone asking for the same key
+    while it is in flight waits and gets the same response (or exception).
+    Nothing is kept once the call finishes, so this never serves stale data.
+    Callers share the response object and must not mutate its rows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.stats = {'calls': 0, 'executed': 0, 'coalesced': 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            self.stats['calls'] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.stats['executed'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+
+class TableQuery:
+    """Wraps a PostgREST query builder and records the query as it is built.
+
+    Reads of ``SHARED_CACHE_TABLES`` check the shared cache first. Other
+    reads, and misses, go through ``SingleFlight`` keyed by table, selected
+    columns and filters, then ``ResilientReads``; if a read was answered from
+    a snapshot, the request is marked stale so templates can say so. Writes
+    (and anything with unhashable arguments) only pass the circuit breaker,
+    and every write bumps its table's shared-cache version. The tokens from
+    just before and after this query's own bump are kept in
+    ``version_change``.
+    """
+
+    WRITE_METHODS = {'insert', 'update', 'upsert', 'delete'}
+
+    def __init__(self, client, table_name: str, backend: 'LazySupabase'):
+        self._builder = client.table(table_name)
+        self._table = table_name
+        self._single_flight = backend.single_flight
+        self._resilience = backend.resilience
+        self._shared_cache = backend.shared_cache
+        self._key = [table_name]
+        self._write = False
+        self.version_change = None
+
+    def __getattr__(self, name):
+        method = getattr(self._builder, name)
+
+        def _chain(*args, **kwargs):
+            self._builder = method(*args, **kwargs)
+            self._key.append((name, args, tuple(sorted(kwargs.items()))))
+            if name in self.WRITE_METHODS:
+                self._write = True
+            return self
+        return _chain
+
+    def execute(self, allow_stale: bool = True, fresh: bool = False):
+        """Run the query.
+
+        ``allow_stale=False`` makes a failed read raise instead of returning
+        an old snapshot. ``fresh=True`` also skips the shared cache, which can
+        lag edits made outside the app by up to ``SHARED_CACHE_TTL``. Reads a
+        write decision depends on (conflict checks, the row being acted on)
+        use ``fresh=True`` so they either see the database or fail the action.
+        """
+        if fresh:
+            allow_stale = False
+        if self._write:
+            try:
+                before = self._shared_cache.get_version(self._table)
+            except Exception as e:
+                print('Error reading shared cache version:', self._table, e)
+                before = None
+            result = self._resilience.write(self._builder.execute)
+            # Every written table gets a new token, cached or not, so derived
+            # data (like the utilization rollup) can tell something changed.
+            try:
+                after = self._shared_cache.bump_version(self._table)
+                if before is not None:
+                    self.version_change = (before, after)
+            except Exception as e:
+                print('Error bumping shared cache version:', self._table, e)
+            return result
+        key = tuple(self._key)
+        try:
+            hash(key)
+        except TypeError:
+            return self._resilience.write(self._builder.execute)
+
+        shared = self._table in SHARED_CACHE_TABLES and not fresh
+        if shared:
+            # Read the version before the backend so a write that lands in
+            # between leaves this entry under the old, now unreachable, token.
+            try:
+                version = self._shared_cache.get_version(self._table)
+                cached = self._shared_cache.get(self._table, version, repr(key))
+                if cached is not None:
+                    return CachedResponse(cached)
+            except Exception as e:
+                print('Error reading shared cache:', self._table, e)
+                shared = False
+
+        result, stale_since = self._single_flight.do(
+            key + (('allow_stale', allow_stale),),
+            lambda: self._resilience.read(key, self._builder.execute, allow_stale),
+        )
+        if stale_since is not None and has_request_context():
+            g.stale_since = min(stale_since, g.get('stale_since') or stale_since)
+        elif shared:
+            try:
+                self._shared_cache.set(self._table, version, repr(key), result.data)
+            except Exception as e:
+                print('Error writing shared cache:', self._table, e)
+        return result
+
+
+supabase = LazySupabase()
+
+
+@app.context_processor
+def inject_staleness():
+    return {'stale_since': g.get('stale_since')}
+
+
+@lru_cache(maxsize=8192)
+def _to_minute_dt(value: str):
+    """Parse a timestamp string down to the minute, or None if it can't be read."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace(' ', 'T')[:16])
+    except Exception as parse_err:
+        print('Error parsing datetime:', value, parse_err)
+        return None
+
+
+def _hour_chunks(start: datetime, end: datetime):
+    """Split [start, end) on hour boundaries into (chunk_start, minutes) pairs."""
+    cursor = start
+    while cursor < end:
+        next_hour = cursor.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        chunk_end = min(next_hour, end)
+        yield cursor, int((chunk_end - cursor).total_seconds() // 60)
+        cursor = chunk_end
+
+
+class UtilizationRollup:
+    """Running booked/blackout minute totals per room, building and department.
+
+    The tables are scanned on first use; after that the admin routes push each
+    new or changed assignment (and each blackout) in here, so reads only touch
+    the buckets they return instead of the whole history.
+
+    Other workers write too, and rows can be edited directly in Supabase, so
+    every report first compares the shared-cache version tokens of
+    ``SOURCE_TABLES`` with the ones the rollup was built from. If any token
+    moved, or the rollup is older than ``max_age`` seconds, it is rebuilt.
+    This worker's own writes pass their ``version_change`` in, and the rollup
+    moves to the new token if it held the one from just before the write,
+    so its own writes don't force a rebuild.
+    """
+
+    SCOPES = ('room', 'building', 'department')
+    SOURCE_TABLES = ('Room Assignment', 'Blackout Hours')
+
+    def __init__(self, max_age: float = None):
+        self._lock = threading.Lock()
+        self.ready = False
+        self.max_age = max_age if max_age is not None else float(
+            os.environ.get("UTILIZATION_MAX_AGE", os.environ.get("SHARED_CACHE_TTL", "300"))
+        )
+        self._versions = None
+        self._built_at = None
+        # scope -> key -> {'booked_day', 'booked_week', 'blackout_day', 'blackout_week', 'peak_hours'}
+        self.totals = {scope: {} for scope in self.SCOPES}
+        # assignment_id -> (row, keys, chunks) so an update can back out the old numbers
+        self._assignments = {}
+        self._room_building = {}
+        self._section_dept = {}
+
+    def _bucket(self, scope: str, key: str):
+        entry = self.totals[scope].get(key)
+        if entry is None:
+            entry = {
+                'booked_day': defaultdict(int),
+                'booked_week': defaultdict(int),
+                'blackout_day': defaultdict(int),
+                'blackout_week': defaultdict(int),
+                'peak_hours': [0] * 24,
+            }
+            self.totals[scope][key] = entry
+        return entry
+
+    def _load_lookups(self):
+        rooms = supabase.table('Room').select('room_id, building_id').execute(allow_stale=False).data or []
+        sections = supabase.table('Section').select('section_id, course_id').execute(allow_stale=False).data or []
+        courses = supabase.table('Course').select('*').execute(allow_stale=False).data or []
+        dept_by_course = {
+            c.get('course_id'): c.get('department_id') or c.get('dept_id') for c in courses
+        }
+        self._room_building = {r.get('room_id'): r.get('building_id') for r in rooms}
+        self._section_dept = {
+            s.get('section_id'): dept_by_course.get(s.get('course_id')) for s in sections
+        }
+
+    def _lookup_section_dept(self, section_id):
+        if section_id in self._section_dept:
+            return self._section_dept[section_id]
+        dept = None
+        try:
+            s_resp = supabase.table('Section').select('course_id').eq('section_id', section_id).execute()
+            if s_resp.data:
+                c_resp = supabase.table('Course').select('*').eq('course_id', s_resp.data[0].get('course_id')).execute()
+                if c_resp.data:
+                    dept = c_resp.data[0].get('department_id') or c_resp.data[0].get('dept_id')
+        except Exception as e:
+            print('Error looking up department for utilization:', e)
+        self._section_dept[section_id] = dept
+        return dept
+
+    def _lookup_room_building(self, room_id):
+        if room_id in self._room_building:
+            return self._room_building[room_id]
+        building = None
+        try:
+            r_resp = supabase.table('Room').select('building_id').eq('room_id', room_id).execute()
+            if r_resp.data:
+                building = r_resp.data[0].get('building_id')
+        except Exception as e:
+            print('Error looking up building for utilization:', e)
+        self._room_building[room_id] = building
+        return building
+
+    def _keys_for(self, room_id, section_id=None):
+        keys = [('room', str(room_id)) if room_id is not None else None]
+        building = self._lookup_room_building(room_id) if room_id is not None else None
+        keys.append(('building', str(building)) if building is not None else None)
+        dept = self._lookup_section_dept(section_id) if section_id is not None else None
+        keys.append(('department', str(dept)) if dept is not None else None)
+        return [k for k in keys if k]
+
+    def _apply(self, keys, chunks, kind: str, sign: int):
+        for scope, key in keys:
+            entry = self._bucket(scope, key)
+            for day, week, hour, minutes in chunks:
+                entry[kind + '_day'][day] += sign * minutes
+                entry[kind + '_week'][week] += sign * minutes
+                if kind == 'booked':
+                    entry['peak_hours'][hour] += sign * minutes
+
+    @staticmethod
+    def _chunks(start_raw, end_raw):
+        start = _to_minute_dt(start_raw)
+        end = _to_minute_dt(end_raw)
+        if not (start and end) or end <= start:
+            return []
+        chunks = []
+        for chunk_start, minutes in _hour_chunks(start, end):
+            iso_year, iso_week, _ = chunk_start.isocalendar()
+            chunks.append((
+                chunk_start.date().isoformat(),
+                f"{iso_year}-W{iso_week:02d}",
+                chunk_start.hour,
+                minutes,
+            ))
+        return chunks
+
+    def _record_assignment(self, row: dict):
+        assignment_id = row.get('assignment_id') or row.get('assign_id')
+        previous = self._assignments.pop(assignment_id, None) if assignment_id is not None else None
+        if previous:
+            prev_row, prev_keys, prev_chunks = previous
+            self._apply(prev_keys, prev_chunks, 'booked', -1)
+            # Partial update payloads don't carry every column; keep what we knew.
+            row = {**prev_row, **{k: v for k, v in row.items() if v is not None}}
+        keys = self._keys_for(row.get('room_id'), row.get('section_id'))
+        chunks = self._chunks(row.get('start'), row.get('end'))
+        self._apply(keys, chunks, 'booked', 1)
+        if assignment_id is not None:
+            self._assignments[assignment_id] = (row, keys, chunks)
+
+    def _record_blackout(self, row: dict):
+        keys = self._keys_for(row.get('room_id'))
+        self._apply(keys, self._chunks(row.get('start'), row.get('end')), 'blackout', 1)
+
+    def _source_versions(self):
+        try:
+            return tuple(supabase.shared_cache.get_version(t) for t in self.SOURCE_TABLES)
+        except Exception as e:
+            print('Error reading utilization source versions:', e)
+            return None
+
+    def _is_current(self, versions) -> bool:
+        return (
+            self.ready
+            and versions == self._versions
+            and time.monotonic() - self._built_at < self.max_age
+        )
+
+    def ensure_loaded(self):
+        """(Re)build the rollup from the full tables if it's missing or out of date."""
+        # Read the tokens before the rows, so a write that lands during the
+        # rebuild moves them again and triggers another rebuild next time.
+        versions = self._source_versions()
+        if self._is_current(versions):
+            return
+        with self._lock:
+            if self._is_current(versions):
+                return
+            previous = (self.totals, self._assignments, self._room_building, self._section_dept)
+            self.totals = {scope: {} for scope in self.SCOPES}
+            self._assignments = {}
+            try:
+                self._load_lookups()
+                for ra in supabase.table('Room Assignment').select('*').execute(allow_stale=False).data or []:
+                    self._record_assignment(ra)
+                for bo in supabase.table('Blackout Hours').select('*').execute(allow_stale=False).data or []:
+                    self._record_blackout(bo)
+                self._versions = versions
+                self._built_at = time.monotonic()
+                self.ready = True
+            except Exception as e:
+                print('Error building utilization rollup:', e)
+                # Keep serving the last complete build; try again next report.
+                self.totals, self._assignments, self._room_building, self._section_dept = previous
+
+    def _adopt_version(self, table: str, version_change):
+        # Only safe if nothing else moved the token between our last check and
+        # this write; otherwise leave it for the next report to rebuild.
+        if not version_change or self._versions is None:
+            return
+        before, after = version_change
+        index = self.SOURCE_TABLES.index(table)
+        if self._versions[index] == before:
+            self._versions = self._versions[:index] + (after,) + self._versions[index + 1:]
+
+    def record_assignments(self, rows, version_change=None):
+        """Fold created or updated Room Assignment rows into the totals.
+
+        ``version_change`` is the write's ``TableQuery.version_change``.
+        """
+        if not self.ready or not rows:
+            return
+        with self._lock:
+            for row in rows:
+                try:
+                    self._record_assignment(row)
+                except Exception as e:
+                    print('Error recording assignment in utilization rollup:', e)
+            self._adopt_version('Room Assignment', version_change)
+
+    def record_blackout(self, row: dict, version_change=None):
+        """Fold a new Blackout Hours row into the totals."""
+        if not self.ready or not row:
+            return
+        with self._lock:
+            try:
+                self._record_blackout(row)
+            except Exception as e:
+                print('Error recording blackout in utilization rollup:', e)
+                return
+            self._adopt_version('Blackout Hours', version_change)
+
+    def report(self, scope: str, period: str = 'day', key: str = None):
+        """Return one row per key in ``scope`` with booked/blackout minutes per ``period``."""
+        self.ensure_loaded()
+        if scope not in self.totals or period not in ('day', 'week'):
+            return []
+        with self._lock:
+            if key is not None:
+                entries = [(key, self.totals[scope][key])] if key in self.totals[scope] else []
+            else:
+                entries = sorted(self.totals[scope].items())
+            rows = []
+            for entry_key, entry in entries:
+                booked = {b: m for b, m in sorted(entry['booked_' + period].items()) if m}
+                blackout = {b: m for b, m in sorted(entry['blackout_' + period].items()) if m}
+                peak_hours = list(entry['peak_hours'])
+                peak_minutes = max(peak_hours)
+                rows.append({
+                    'key': entry_key,
+                    'booked': booked,
+                    'blackout': blackout,
+                    'booked_total': sum(booked.values()),
+                    'blackout_total': sum(blackout.values()),
+                    'peak_hours': peak_hours,
+                    'peak_hour': peak_hours.index(peak_minutes) if peak_minutes else None,
+                })
+            return rows
+
+
+utilization = UtilizationRollup()
+
+
+TIMETABLE_DIR = os.environ.get("TIMETABLE_DIR", os.path.join(app.root_path, "timetables"))
+
+
+def _ics_escape(value) -> str:
+    text = str(value or '')
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _ics_time(value):
+    dt = _to_minute_dt(value)
+    return dt.strftime('%Y%m%dT%H%M%S') if dt else None
+
+
+def _week_window(now: datetime = None):
+    """Monday 00:00 of the week containing ``now`` and the Monday after it."""
+    now = now or datetime.now()
+    start = datetime.combine(now.date() - timedelta(days=now.weekday()), datetime.min.time())
+    return start, start + timedelta(days=7)
+
+
+class TimetableSnapshots:
+    """Writes this week's per-room, per-building and per-department timetables to disk.
+
+    Each target gets a static ``.html`` page and an ``.ics`` calendar in
+    ``TIMETABLE_DIR``, which can be served straight from disk (by Flask here,
+    or by the front-end web server without touching Python at all). Only the
+    current Monday-to-Sunday week is written, so files stay small.
+
+    When an assignment changes, the targets it moved out of or into are
+    queued and rewritten by a background thread, off the admin request.
+    Every file's mtime is set to the time its rows were read, and a file is
+    only replaced, under a per-target ``flock``, by data read later than
+    that. Reads never fall back to snapshots, so an outage skips the write
+    (and retries it) instead of putting stale rows on disk.
+
+    Edits made directly in Supabase (and renamed courses, rooms or sections)
+    don't go through ``refresh_for_assignments``, so a file read more than
+    ``max_age`` seconds ago is rebuilt the next time it is requested.
+    """
+
+    SCOPES = ('room', 'building', 'department')
+    FORMATS = {'html': 'text/html', 'ics': 'text/calendar'}
+    RETRY_DELAY = 5.0
+
+    def __init__(self, directory: str, max_age: float = None):
+        self.directory = directory
+        self.max_age = max_age if max_age is not None else float(
+            os.environ.get("TIMETABLE_MAX_AGE", os.environ.get("SHARED_CACHE_TTL", "300"))
+        )
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._scheduled = False
+
+    @staticmethod
+    def safe_key(key) -> str:
+        return re.sub(r'[^A-Za-z0-9_-]', '_', str(key))
+
+    @classmethod
+    def filename(cls, scope: str, key, fmt: str) -> str:
+        return f"{scope}-{cls.safe_key(key)}.{fmt}"
+
+    def path(self, scope: str, key, fmt: str) -> str:
+        return os.path.join(self.directory, self.filename(scope, key, fmt))
+
+    def known_targets(self):
+        """Every (scope, key) with a timetable, from the small shared-cached tables."""
+        rooms = supabase.table('Room').select('*').execute(allow_stale=False).data or []
+        buildings = supabase.table('Building').select('*').execute(allow_stale=False).data or []
+        departments = supabase.table('Department').select('*').execute(allow_stale=False).data or []
+        known = set()
+        for r in rooms:
+            known |= self.targets_for(r)
+        for b in buildings:
+            if b.get('building_id') is not None:
+                known.add(('building', str(b.get('building_id'))))
+        for d in departments:
+            dept_id = d.get('department_id') or d.get('dept_id')
+            if dept_id is not None:
+                known.add(('department', str(dept_id)))
+        return known
+
+    def resolve(self, scope: str, key: str):
+        """Map a key from a URL or filename back to the real id, or None if there isn't one."""
+        safe = self.safe_key(key)
+        for known_scope, known_key in self.known_targets():
+            if known_scope == scope and self.safe_key(known_key) == safe:
+                return known_key
+        return None
+
+    def _load_catalog(self):
+        rooms = supabase.table('Room').select('*').execute(allow_stale=False).data or []
+        sections = supabase.table('Section').select('*').execute(allow_stale=False).data or []
+        courses = supabase.table('Course').select('*').execute(allow_stale=False).data or []
+        return (
+            {r.get('room_id'): r for r in rooms},
+            {s.get('section_id'): s for s in sections},
+            {c.get('course_id'): c for c in courses},
+        )
+
+    @staticmethod
+    def _dept_for(section_id, section_by_id, course_by_id):
+        s = section_by_id.get(section_id) or {}
+        c = course_by_id.get(s.get('course_id')) or {}
+        return c.get('department_id') or c.get('dept_id')
+
+    def _load_entries(self, catalog, week_start: datetime, week_end: datetime):
+        room_by_id, section_by_id, course_by_id = catalog
+        # Room Assignment is what just changed, so it skips the shared cache too.
+        assignments = (
+            supabase.table('Room Assignment').select('*')
+            .lt('start', week_end.isoformat())
+            .gt('end', week_start.isoformat())
+            .execute(fresh=True).data or []
+        )
+
+        entries = []
+        for ra in assignments:
+            start, end = _to_minute_dt(ra.get('start')), _to_minute_dt(ra.get('end'))
+            r = room_by_id.get(ra.get('room_id'))
+            if not (r and start and end) or start >= week_end or end <= week_start:
+                continue
+            s = section_by_id.get(ra.get('section_id')) or {}
+            c = course_by_id.get(s.get('course_id')) or {}
+            entries.append({
+                'assignment_id': ra.get('assignment_id') or ra.get('assign_id'),
+                'room_id': r.get('room_id'),
+                'building_id': r.get('building_id'),
+                'room_num': r.get('room_num'),
+                'dept_id': c.get('department_id') or c.get('dept_id'),
+                'course_id': c.get('course_id'),
+                'course_name': c.get('name') or c.get('course_name'),
+                'section_id': s.get('section_id'),
+                'instructor': s.get('instructor'),
+                'start': ra.get('start'),
+                'end': ra.get('end'),
+            })
+        entries.sort(key=lambda e: _to_minute_dt(e['start']))
+        return entries
+
+    @staticmethod
+    def targets_for(room: dict, dept_id=None):
+        targets = set()
+        if room.get('room_id') is not None:
+            targets.add(('room', str(room.get('room_id'))))
+        if room.get('building_id') is not None:
+            targets.add(('building', str(room.get('building_id'))))
+        if dept_id is not None:
+            targets.add(('department', str(dept_id)))
+        return targets
+
+    def _render_ics(self, title: str, entries) -> str:
+        lines = [
+            'BEGIN:VCALENDAR',
+            'VERSION:2.0',
+            'PRODID:-//Class Scheduler//Timetables//EN',
+            f'X-WR-CALNAME:{_ics_escape(title)}',
+        ]
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        for e in entries:
+            start, end = _ics_time(e['start']), _ics_time(e['end'])
+            if not (start and end):
+                continue
+            lines += [
+                'BEGIN:VEVENT',
+                f"UID:assignment-{e['assignment_id']}@class-scheduler",
+                f'DTSTAMP:{stamp}',
+                f'DTSTART:{start}',
+                f'DTEND:{end}',
+                f"SUMMARY:{_ics_escape(' '.join(str(v) for v in (e['course_id'], e['course_name']) if v))}",
+                f"LOCATION:{_ics_escape(str(e['building_id']) + ' ' + str(e['room_num']))}",
+                f"DESCRIPTION:{_ics_escape('Instructor: ' + str(e['instructor'] or 'TBA'))}",
+                'END:VEVENT',
+            ]
+        lines.append('END:VCALENDAR')
+        return '\r\n'.join(lines) + '\r\n'
+
+    def _write(self, scope: str, key: str, entries, week_start: datetime, stamp: int) -> bool:
+        """Write one target's files unless they already hold data read at or after ``stamp``."""
+        title = f"{scope.capitalize()} {key}"
+        days = defaultdict(list)
+        for e in entries:
+            days[_to_minute_dt(e['start']).date()].append(e)
+        html = app.jinja_env.get_template('timetable.html').render(
+            title=title,
+            scope=scope,
+            key=key,
+            ics_name=self.filename(scope, key, 'ics'),
+            week_start=week_start,
+            days=sorted(days.items()),
+            generated_at=datetime.now(),
+        )
+        ics = self._render_ics(title, entries)
+
+        lock_path = os.path.join(self.directory, f".{scope}-{self.safe_key(key)}.lock")
+        with open(lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            html_path = self.path(scope, key, 'html')
+            try:
+                if os.stat(html_path).st_mtime_ns >= stamp:
+                    return False
+            except FileNotFoundError:
+                pass
+            # The .html file is written last, so its stamp only moves once both are done.
+            for fmt, text in (('ics', ics), ('html', html)):
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+                with os.fdopen(fd, 'w', newline='') as f:
+                    f.write(text)
+                os.utime(tmp_path, ns=(stamp, stamp))
+                os.replace(tmp_path, self.path(scope, key, fmt))
+            return True
+
+    def _write_targets(self, targets, entries, week_start: datetime, stamp: int) -> int:
+        grouped = defaultdict(list)
+        for e in entries:
+            for target in self.targets_for(e, e['dept_id']):
+                grouped[target].append(e)
+        written = 0
+        for scope, key in targets:
+            written += self._write(scope, key, grouped.get((scope, key), []), week_start, stamp)
+        return written
+
+    def regenerate(self, targets=None) -> int:
+        """Rewrite the given ``(scope, key)`` targets, or every known target if None.
+
+        Keys must be real ids (see ``resolve``). Returns how many snapshots
+        were written; targets that already hold newer data are left alone.
+        """
+        stamp = time.time_ns()
+        os.makedirs(self.directory, exist_ok=True)
+        week_start, week_end = _week_window()
+        targets = self.known_targets() if targets is None else set(targets)
+        entries = self._load_entries(self._load_catalog(), week_start, week_end)
+        return self._write_targets(targets, entries, week_start, stamp)
+
+    def is_current(self, scope: str, key, fmt: str) -> bool:
+        """True if the file was built this week from data read under ``max_age`` seconds ago."""
+        week_start, _ = _week_window()
+        try:
+            stamp = os.stat(self.path(scope, key, fmt)).st_mtime_ns
+        except OSError:
+            return False
+        return (
+            stamp >= int(week_start.timestamp() * 1e9)
+            and time.time_ns() - stamp < self.max_age * 1e9
+        )
+
+    def refresh_for_assignments(self, rows):
+        """Queue the snapshots these Room Assignment rows belong to for a rewrite."""
+        with self._lock:
+            self._pending |= {(row.get('room_id'), row.get('section_id')) for row in rows}
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._schedule(0)
+
+    def _schedule(self, delay: float):
+        timer = threading.Timer(delay, self._drain)
+        timer.daemon = True
+        timer.start()
+
+    def _drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        try:
+            stamp = time.time_ns()
+            os.makedirs(self.directory, exist_ok=True)
+            week_start, week_end = _week_window()
+            catalog = self._load_catalog()
+            room_by_id, section_by_id, course_by_id = catalog
+            targets = set()
+            for room_id, section_id in pending:
+                room = room_by_id.get(room_id)
+                if room:
+                    targets |= self.targets_for(room, self._dept_for(section_id, section_by_id, course_by_id))
+            entries = self._load_entries(catalog, week_start, week_end)
+            self._write_targets(targets, entries, week_start, stamp)
+        except Exception as e:
+            print('Error refreshing timetable snapshots:', e)
+            if isinstance(e, CircuitOpenError) or is_transient_error(e):
+                with self._lock:
+                    self._pending |= pending
+                self._schedule(self.RETRY_DELAY)
+                return
+        with self._lock:
+            if not self._pending:
+                self._scheduled = False
+                return
+        self._schedule(0)
+
+
+timetables = TimetableSnapshots(TIMETABLE_DIR)
+
+
+@app.cli.command('build-timetables')
+def build_timetables_command():
+    """Write this week's room, building and department timetables to TIMETABLE_DIR."""
+    print(f"Wrote {timetables.regenerate()} timetables into {TIMETABLE_DIR}")
+
+
+SEARCH_REFRESH_SECONDS = float(os.environ.get("SEARCH_REFRESH_SECONDS", "60"))
+
+
+def _search_tokens(text) -> list:
+    return re.findall(r'[a-z0-9]+', str(text or '').lower())
+
+
+def _row_matches_search(words, row: dict) -> bool:
+    """True if every query word starts some word of this row's course, department or instructor."""
+    tokens = []
+    for field in ('course_id', 'course_name', 'dept_id', 'dept_name', 'instructor'):
+        tokens += _search_tokens(row.get(field))
+    tokens.append(''.join(_search_tokens(row.get('course_id'))))
+    return all(any(token.startswith(word) for token in tokens) for word in words)
+
+
+class CourseSearchIndex:
+    """In-memory prefix index over courses for search and autocomplete.
+
+    Each course is a document made of its id, name, department and the
+    instructors of its sections. Every prefix of every word in it (up to
+    ``MAX_PREFIX`` characters) maps to the set of course ids containing it,
+    so a lookup is a few dict hits and a set intersection no matter how big
+    the catalog is.
+
+    Course, Section and Department rows are re-read at most every
+    ``refresh_seconds`` (cheap once the shared cache is warm) and compared
+    with what was indexed; only courses whose rows actually changed are
+    re-indexed.
+    """
+
+    MAX_PREFIX = 20
+
+    def __init__(self, refresh_seconds: float = SEARCH_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._postings = defaultdict(set)   # prefix -> course ids
+        self._doc_prefixes = {}             # course id -> prefixes indexed for it
+        self._docs = {}                     # course id -> autocomplete payload
+        self._signatures = {}               # course id -> rows it was built from
+        self._loaded_at = None
+
+    def _prefixes(self, doc: dict) -> set:
+        words = []
+        for field in ('course_id', 'course_name', 'dept_id', 'dept_name'):
+            words += _search_tokens(doc.get(field))
+        for instructor in doc.get('instructors', []):
+            words += _search_tokens(instructor)
+        # "CS-440" should also be found by typing "cs44".
+        words.append(''.join(_search_tokens(doc.get('course_id'))))
+        prefixes = set()
+        for word in words:
+            for n in range(1, min(len(word), self.MAX_PREFIX) + 1):
+                prefixes.add(word[:n])
+        return prefixes
+
+    def _remove(self, course_id):
+        for prefix in self._doc_prefixes.pop(course_id, ()):
+            postings = self._postings.get(prefix)
+            if postings is not None:
+                postings.discard(course_id)
+                if not postings:
+                    del self._postings[prefix]
+        self._docs.pop(course_id, None)
+        self._signatures.pop(course_id, None)
+
+    def _add(self, course_id, doc: dict, signature):
+        prefixes = self._prefixes(doc)
+        for prefix in prefixes:
+            self._postings[prefix].add(course_id)
+        self._doc_prefixes[course_id] = prefixes
+        self._docs[course_id] = doc
+        self._signatures[course_id] = signature
+
+    def _load(self) -> int:
+        courses = supabase.table('Course').select('*').execute().data or []
+        sections = supabase.table('Section').select('*').execute().data or []
+        departments = supabase.table('Department').select('*').execute().data or []
+
+        dept_name_by_id = {
+            (d.get('department_id') or d.get('dept_id')): d.get('name') or d.get('dept_name')
+            for d in departments
+        }
+        instructors_by_course = defaultdict(set)
+        for sec in sections:
+            if sec.get('instructor'):
+                instructors_by_course[sec.get('course_id')].add(sec.get('instructor'))
+
+        fresh = {}
+        for c in courses:
+            course_id = c.get('course_id')
+            if course_id is None:
+                continue
+            dept_id = c.get('department_id') or c.get('dept_id')
+            doc = {
+                'course_id': course_id,
+                'course_name': c.get('name') or c.get('course_name'),
+                'dept_id': dept_id,
+                'dept_name': dept_name_by_id.get(dept_id),
+                'instructors': sorted(instructors_by_course.get(course_id, ())),
+            }
+            fresh[course_id] = doc
+
+        changed = 0
+        with self._lock:
+            for course_id in set(self._docs) - set(fresh):
+                self._remove(course_id)
+                changed += 1
+            for course_id, doc in fresh.items():
+                signature = tuple(sorted((k, str(v)) for k, v in doc.items()))
+                if self._signatures.get(course_id) == signature:
+                    continue
+                self._remove(course_id)
+                self._add(course_id, doc, signature)
+                changed += 1
+            self._loaded_at = time.monotonic()
+        return changed
+
+    def refresh(self, force: bool = False):
+        """Pick up Course/Section/Department changes if the index is due for it."""
+        due = (
+            force
+            or self._loaded_at is None
+            or time.monotonic() - self._loaded_at >= self.refresh_seconds
+        )
+        if not due:
+            return
+        # Only one request reloads; the rest keep using the current index
+        # unless there isn't one yet.
+        if not self._refresh_lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            if force or self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds:
+                self._load()
+        except Exception as e:
+            # Keep answering from what's already indexed.
+            print('Error refreshing course search index:', e)
+        finally:
+            self._refresh_lock.release()
+
+    def search(self, query: str, limit: int = None) -> list:
+        """Return courses matching every word of ``query`` as a prefix, best first."""
+        self.refresh()
+        words = [w[:self.MAX_PREFIX] for w in _search_tokens(query)]
+        if not words:
+            return []
+        with self._lock:
+            matches = None
+            for word in sorted(words, key=lambda w: len(self._postings.get(w, ()))):
+                ids = self._postings.get(word, set())
+                matches = set(ids) if matches is None else matches & ids
+                if not matches:
+                    return []
+            docs = [self._docs[course_id] for course_id in matches]
+
+        compact = ''.join(words)
+
+        def rank(doc):
+            course_key = ''.join(_search_tokens(doc.get('course_id')))
+            name_key = str(doc.get('course_name') or '').lower()
+            return (
+                course_key != compact,
+                not course_key.startswith(compact),
+                not name_key.startswith(words[0]),
+                str(doc.get('course_id')),
+            )
+
+        docs.sort(key=rank)
+        return docs[:limit] if limit else docs
+
+
+course_search = CourseSearchIndex()
 
 
 @app.route('/')
@@ -95,6 +1458,14 @@ def student():
     building_id = request.args.get('building_id', '').strip()
     dept_id = request.args.get('dept_id', '').strip()
     time_filter = request.args.get('time', '').strip()
+    search_text = request.args.get('q', '').strip()
+
+    matching_courses = None
+    search_words = _search_tokens(search_text)
+    if search_text:
+        # The index narrows it down to courses; rows are then checked one by one,
+        # so an instructor search only shows that instructor's sections.
+        matching_courses = {str(c.get('course_id')) for c in course_search.search(search_text)}
 
     buildings = []
     departments = []
@@ -141,17 +1512,6 @@ def student():
     results = []
     # Track which courses actually have room assignments so we can have a driopdown
     available_courses = {}
-    def _to_minute_dt(value: str):
-        if not value:
-            return None
-        text = str(value).replace(' ', 'T')
-        trimmed = text[:16]
-        try:
-            return datetime.fromisoformat(trimmed)
-        except Exception as parse_err:
-            print('Error parsing datetime in student search:', value, parse_err)
-            return None
-
     for ra in room_assignments:
         s = section_by_id.get(ra.get('section_id'))
         if not s:
@@ -192,6 +1552,7 @@ def student():
             'section_id': s.get('section_id'),
             'section_type': section_type_out,
             'section_num': section_num_out,
+            'instructor': s.get('instructor'),
             'building_id': r.get('building_id'),
             'room_num': r.get('room_num'),
             'room_type': r.get('room_type'),
@@ -202,6 +1563,10 @@ def student():
 
         if class_number and str(row.get('course_id')) != class_number:
             continue
+        if matching_courses is not None and str(row.get('course_id')) not in matching_courses:
+            continue
+        if search_words and not _row_matches_search(search_words, row):
+            continue
         if building_id and str(row.get('building_id')) != building_id:
             continue
         if dept_id and str(row.get('dept_id')) != dept_id:
@@ -258,6 +1623,7 @@ def student():
         available_classes=available_classes,
         results=results,
         class_number=class_number,
+        search_text=search_text,
         selected_building=building_id,
         selected_dept=dept_id,
         time_filter=time_filter,
@@ -265,6 +1631,16 @@ def student():
 
 
 
+@app.route('/student/autocomplete')
+def student_autocomplete():
+    query = request.args.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), 50))
+    except ValueError:
+        limit = 10
+    return jsonify(course_search.search(query, limit=limit) if query else [])
+
+
 @app.route('/secretary')
 def secretary():
     if 'user' not in session or session['user'].get('role') != 'secretary':
@@ -343,7 +1719,7 @@ def create_class_request():
     preferred_room_text = None
     if preferred_room_id:
         try:
-            room_resp = supabase.table('Room').select('building_id, room_num').eq('room_id', int(preferred_room_id)).execute()
+            room_resp = supabase.table('Room').select('building_id, room_num').eq('room_id', int(preferred_room_id)).execute(fresh=True)
             if room_resp.data:
                 room = room_resp.data[0]
                 preferred_room_text = f"{room.get('building_id')} {room.get('room_num')}"
@@ -399,7 +1775,7 @@ def update_class_request(request_id: int):
     preferred_room_text = None
     if preferred_room_id:
         try:
-            room_resp = supabase.table('Room').select('building_id, room_num').eq('room_id', int(preferred_room_id)).execute()
+            room_resp = supabase.table('Room').select('building_id, room_num').eq('room_id', int(preferred_room_id)).execute(fresh=True)
             if room_resp.data:
                 room = room_resp.data[0]
                 preferred_room_text = f"{room.get('building_id')} {room.get('room_num')}"
@@ -503,7 +1879,7 @@ def accept_request(request_id: int):
         return redirect(url_for('admin'))
 
     try:
-        resp = supabase.table('Class Request').select('*').eq('request_id', request_id).execute()
+        resp = supabase.table('Class Request').select('*').eq('request_id', request_id).execute(fresh=True)
         if not resp.data:
             return redirect(url_for('admin'))
         req = resp.data[0]
@@ -512,24 +1888,13 @@ def accept_request(request_id: int):
         new_start_raw = req.get('requested_start')
         new_end_raw = req.get('requested_end')
 
-        def _to_minute_dt(value: str):
-            if not value:
-                return None
-           
-            trimmed = value[:16]
-            try:
-                return datetime.fromisoformat(trimmed)
-            except Exception as parse_err:
-                print('Error parsing datetime for conflict check:', value, parse_err)
-                return None
-
         ns = _to_minute_dt(new_start_raw)
         ne = _to_minute_dt(new_end_raw)
 
         if ns and ne:
             
             try:
-                existing_resp = supabase.table('Room Assignment').select('start,end').eq('room_id', int(room_id)).execute()
+                existing_resp = supabase.table('Room Assignment').select('start,end').eq('room_id', int(room_id)).execute(fresh=True)
                 for ra in existing_resp.data:
                     exist_start_raw = ra.get('start')
                     exist_end_raw = ra.get('end')
@@ -543,10 +1908,11 @@ def accept_request(request_id: int):
                         return redirect(url_for('admin', error='That room is already booked for this time slot. Please choose another room.'))
             except Exception as e_conflict:
                 print('Error checking for room conflicts:', e_conflict)
+                return redirect(url_for('admin', error='Could not check that room for conflicts right now. Please try again.'))
 
             
             try:
-                blackout_resp = supabase.table('Blackout Hours').select('start,end').eq('room_id', int(room_id)).execute()
+                blackout_resp = supabase.table('Blackout Hours').select('start,end').eq('room_id', int(room_id)).execute(fresh=True)
                 for bo in blackout_resp.data:
                     bo_start_raw = bo.get('start')
                     bo_end_raw = bo.get('end')
@@ -559,6 +1925,7 @@ def accept_request(request_id: int):
                         return redirect(url_for('admin', error='That room is unavailable during the requested time due to blackout hours.'))
             except Exception as e_blackout:
                 print('Error checking blackout hours:', e_blackout)
+                return redirect(url_for('admin', error='Could not check blackout hours for that room right now. Please try again.'))
 
         payload = {
             'request_id': request_id,
@@ -568,11 +1935,14 @@ def accept_request(request_id: int):
             'end': req.get('requested_end'),
             'status': 'assigned',
         }
-        supabase.table('Room Assignment').insert(payload).execute()
+        insert_query = supabase.table('Room Assignment').insert(payload)
+        insert_resp = insert_query.execute()
+        utilization.record_assignments(insert_resp.data, insert_query.version_change)
+        timetables.refresh_for_assignments(insert_resp.data or [payload])
 
        
         try:
-            eq_resp = supabase.table('Request Equipment').select('*').eq('request_id', request_id).execute()
+            eq_resp = supabase.table('Request Equipment').select('*').eq('request_id', request_id).execute(fresh=True)
             if eq_resp.data:
                 eq_row = eq_resp.data[0]
                 room_eq_payload = {
@@ -591,6 +1961,7 @@ def accept_request(request_id: int):
             print('Error updating class request status:', e_update)
     except Exception as e:
         print('Error accepting class request:', e)
+        return redirect(url_for('admin', error='Unexpected error while accepting the request.'))
 
     return redirect(url_for('admin'))
 
@@ -602,7 +1973,7 @@ def suggest_room(request_id: int):
 
     try:
         
-        resp = supabase.table('Class Request').select('*').eq('request_id', request_id).execute()
+        resp = supabase.table('Class Request').select('*').eq('request_id', request_id).execute(fresh=True)
         if not resp.data:
             return redirect(url_for('admin', error='Class request not found.'))
         req = resp.data[0]
@@ -610,23 +1981,13 @@ def suggest_room(request_id: int):
         new_start_raw = req.get('requested_start')
         new_end_raw = req.get('requested_end')
 
-        def _to_minute_dt(value: str):
-            if not value:
-                return None
-            trimmed = value[:16]
-            try:
-                return datetime.fromisoformat(trimmed)
-            except Exception as parse_err:
-                print('Error parsing datetime for room suggestion:', value, parse_err)
-                return None
-
         ns = _to_minute_dt(new_start_raw)
         ne = _to_minute_dt(new_end_raw)
         if not (ns and ne):
             return redirect(url_for('admin', error='Request is missing valid start/end times.'))
 
         
-        rooms_resp = supabase.table('Room').select('*').execute()
+        rooms_resp = supabase.table('Room').select('*').execute(fresh=True)
         rooms = rooms_resp.data or []
 
         preferred_room_text = req.get('preferred_room') or ''
@@ -642,7 +2003,7 @@ def suggest_room(request_id: int):
         def is_room_free(room_id: int) -> bool:
             
             try:
-                existing_resp = supabase.table('Room Assignment').select('start,end').eq('room_id', room_id).execute()
+                existing_resp = supabase.table('Room Assignment').select('start,end').eq('room_id', room_id).execute(fresh=True)
                 for ra in existing_resp.data:
                     es = _to_minute_dt(ra.get('start'))
                     ee = _to_minute_dt(ra.get('end'))
@@ -656,7 +2017,7 @@ def suggest_room(request_id: int):
 
             
             try:
-                blackout_resp = supabase.table('Blackout Hours').select('start,end').eq('room_id', room_id).execute()
+                blackout_resp = supabase.table('Blackout Hours').select('start,end').eq('room_id', room_id).execute(fresh=True)
                 for bo in blackout_resp.data:
                     bs = _to_minute_dt(bo.get('start'))
                     be = _to_minute_dt(bo.get('end'))
@@ -701,14 +2062,17 @@ def suggest_room(request_id: int):
             'status': 'assigned',
         }
         try:
-            supabase.table('Room Assignment').insert(payload).execute()
+            insert_query = supabase.table('Room Assignment').insert(payload)
+            insert_resp = insert_query.execute()
+            utilization.record_assignments(insert_resp.data, insert_query.version_change)
+            timetables.refresh_for_assignments(insert_resp.data or [payload])
         except Exception as e_insert:
             print('Error inserting suggested room assignment:', e_insert)
             return redirect(url_for('admin', error='Failed to create room assignment for suggested room.'))
 
         
         try:
-            eq_resp = supabase.table('Request Equipment').select('*').eq('request_id', request_id).execute()
+            eq_resp = supabase.table('Request Equipment').select('*').eq('request_id', request_id).execute(fresh=True)
             if eq_resp.data:
                 eq_row = eq_resp.data[0]
                 room_eq_payload = {
@@ -748,16 +2112,6 @@ def update_assignment(assignment_id: int):
     if not (new_room_id and new_start_raw and new_end_raw):
         return redirect(url_for('admin', error='Room, start, and end are required to update an assignment.'))
 
-    def _to_minute_dt(value: str):
-        if not value:
-            return None
-        trimmed = value[:16]
-        try:
-            return datetime.fromisoformat(trimmed)
-        except Exception as parse_err:
-            print('Error parsing datetime for assignment update:', value, parse_err)
-            return None
-
     ns = _to_minute_dt(new_start_raw)
     ne = _to_minute_dt(new_end_raw)
     if not (ns and ne):
@@ -765,7 +2119,7 @@ def update_assignment(assignment_id: int):
 
     try:
        
-        existing_resp = supabase.table('Room Assignment').select('assignment_id, start, end').eq('room_id', int(new_room_id)).execute()
+        existing_resp = supabase.table('Room Assignment').select('assignment_id, start, end').eq('room_id', int(new_room_id)).execute(fresh=True)
         for ra in existing_resp.data:
             if ra.get('assignment_id') == assignment_id or ra.get('assign_id') == assignment_id:
                 continue
@@ -777,7 +2131,7 @@ def update_assignment(assignment_id: int):
                 return redirect(url_for('admin', error='Updated time conflicts with another assignment in that room.'))
 
         
-        blackout_resp = supabase.table('Blackout Hours').select('start,end').eq('room_id', int(new_room_id)).execute()
+        blackout_resp = supabase.table('Blackout Hours').select('start,end').eq('room_id', int(new_room_id)).execute(fresh=True)
         for bo in blackout_resp.data:
             bs = _to_minute_dt(bo.get('start'))
             be = _to_minute_dt(bo.get('end'))
@@ -787,12 +2141,19 @@ def update_assignment(assignment_id: int):
                 return redirect(url_for('admin', error='Updated time falls within blackout hours for that room.'))
 
         
+        old_resp = supabase.table('Room Assignment').select('*').eq('assignment_id', assignment_id).execute(fresh=True)
+
         update_payload = {
             'room_id': int(new_room_id),
             'start': new_start_raw,
             'end': new_end_raw,
         }
-        supabase.table('Room Assignment').update(update_payload).eq('assignment_id', assignment_id).execute()
+        update_query = supabase.table('Room Assignment').update(update_payload).eq('assignment_id', assignment_id)
+        update_resp = update_query.execute()
+        updated_rows = update_resp.data or [{**update_payload, 'assignment_id': assignment_id}]
+        utilization.record_assignments(updated_rows, update_query.version_change)
+        # The old room, building and department lose the slot, so refresh those too.
+        timetables.refresh_for_assignments((old_resp.data or []) + updated_rows)
 
     except Exception as e:
         print('Error updating room assignment:', e)
@@ -818,13 +2179,96 @@ def add_blackout():
             'end': end,
             'reason': reason,
         }
-        supabase.table('Blackout Hours').insert(payload).execute()
+        insert_query = supabase.table('Blackout Hours').insert(payload)
+        insert_query.execute()
+        utilization.record_blackout(payload, insert_query.version_change)
     except Exception as e:
         print('Error inserting blackout hours:', e)
 
     return redirect(url_for('admin'))
 
 
+@app.route('/admin/utilization')
+def admin_utilization():
+    if 'user' not in session or session['user'].get('role') != 'admin':
+        return redirect(url_for('login'))
+
+    period = request.args.get('period', 'day').strip()
+    if period not in ('day', 'week'):
+        period = 'day'
+
+    reports = {scope: utilization.report(scope, period) for scope in UtilizationRollup.SCOPES}
+    return render_template(
+        'utilization.html',
+        user=session['user'],
+        period=period,
+        reports=reports,
+        ready=utilization.ready,
+    )
+
+
+@app.route('/admin/utilization.json')
+def admin_utilization_json():
+    if 'user' not in session or session['user'].get('role') != 'admin':
+        return jsonify({'error': 'admin login required'}), 401
+
+    scope = request.args.get('scope', 'room').strip()
+    period = request.args.get('period', 'day').strip()
+    key = request.args.get('key', '').strip() or None
+    if scope not in UtilizationRollup.SCOPES:
+        return jsonify({'error': f'scope must be one of {", ".join(UtilizationRollup.SCOPES)}'}), 400
+    if period not in ('day', 'week'):
+        return jsonify({'error': 'period must be day or week'}), 400
+
+    return jsonify({
+        'scope': scope,
+        'period': period,
+        'ready': utilization.ready,
+        'rows': utilization.report(scope, period, key),
+    })
+
+
+@app.route('/timetables/<name>')
+def timetable_snapshot(name: str):
+    stem, _, fmt = name.rpartition('.')
+    scope, _, key = stem.partition('-')
+    if scope not in TimetableSnapshots.SCOPES or fmt not in TimetableSnapshots.FORMATS or not key:
+        abort(404)
+
+    # Same layout as TIMETABLE_DIR, so a web server can serve that directory directly.
+    filename = TimetableSnapshots.filename(scope, key, fmt)
+    if not timetables.is_current(scope, key, fmt):
+        try:
+            real_key = timetables.resolve(scope, key)
+            if real_key is not None:
+                timetables.regenerate({(scope, real_key)})
+        except Exception as e:
+            print('Error generating timetable snapshot:', e)
+            # Keep serving the older copy, if there is one, while the database is down.
+            if not os.path.exists(timetables.path(scope, key, fmt)):
+                abort(503)
+        else:
+            if real_key is None:
+                abort(404)
+    return send_from_directory(TIMETABLE_DIR, filename, mimetype=TimetableSnapshots.FORMATS[fmt])
+
+
+@app.route('/healthz')
+def healthz():
+    if not supabase.ready():
+        return jsonify({
+            'ready': False,
+            'error': str(supabase.last_error),
+            'single_flight': dict(supabase.single_flight.stats),
+        }), 503
+    return jsonify({
+        'ready': True,
+        'single_flight': dict(supabase.single_flight.stats),
+        'resilience': dict(supabase.resilience.stats),
+        'circuit': supabase.resilience.breaker.state,
+    })
+
+
 @app.route('/logout')
 def logout():
     session.clear()
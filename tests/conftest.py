@@ -0,0 +1,48 @@
+"""Runs main.py against loadtest's in-memory PostgREST stand-in."""
+import os
+import sys
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Set before main is imported: these are read at import time.
+_scratch = tempfile.mkdtemp(prefix='class-scheduler-tests-')
+os.environ['TEMPLATE_CACHE_DIR'] = os.path.join(_scratch, 'templates')
+os.environ['TIMETABLE_DIR'] = os.path.join(_scratch, 'timetables')
+os.environ['SHARED_CACHE_BACKEND'] = 'none'
+
+import loadtest  # noqa: E402
+import main  # noqa: E402
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    """A freshly seeded stand-in, with main.supabase pointed at it."""
+    store = loadtest.MemoryStore()
+    store.seed()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), loadtest.make_stub_handler(store))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    monkeypatch.setenv('SUPABASE_URL', f'http://127.0.0.1:{server.server_port}')
+    monkeypatch.setenv('SUPABASE_KEY', 'stub')
+    monkeypatch.setattr(main, 'supabase', main.LazySupabase())
+    # Module-level indexes and snapshots would otherwise keep rows from an earlier test's store.
+    monkeypatch.setattr(main, 'course_search', main.CourseSearchIndex())
+    monkeypatch.setattr(main, 'utilization', main.UtilizationRollup())
+    timetable_dir = str(tmp_path / 'timetables')
+    monkeypatch.setattr(main, 'TIMETABLE_DIR', timetable_dir)
+    monkeypatch.setattr(main, 'timetables', main.TimetableSnapshots(timetable_dir))
+    yield store
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(store):
+    main.app.config['TESTING'] = True
+    return main.app.test_client()
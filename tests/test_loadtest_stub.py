@@ -0,0 +1,63 @@
+import urllib.parse
+
+import pytest
+from postgrest.exceptions import APIError
+
+import main
+
+
+def _rows(query):
+    return query.execute(fresh=True).data
+
+
+def test_range_filters(store):
+    rows = _rows(
+        main.supabase.table('Room Assignment').select('*')
+        .gte('start', '2025-09-03T00:00:00').lt('start', '2025-09-04T00:00:00')
+    )
+    expected = [r for r in store.tables['Room Assignment'] if r['start'].startswith('2025-09-03')]
+    assert rows and len(rows) == len(expected)
+
+
+def test_numeric_filters_compare_as_numbers(store):
+    rows = _rows(main.supabase.table('Room').select('room_id').gt('room_id', 9).lte('room_id', 12))
+    assert [r['room_id'] for r in rows] == [10, 11, 12]
+    rows = _rows(main.supabase.table('Room').select('room_id').neq('building_id', 'B1'))
+    assert len(rows) == 30
+
+
+def test_limit(store):
+    assert len(_rows(main.supabase.table('Room').select('*').limit(3))) == 3
+
+
+def test_timetable_query_is_filtered_server_side(store):
+    store.insert('Room Assignment', {
+        'room_id': 1, 'section_id': 1, 'status': 'assigned',
+        'start': '2030-01-07T09:00:00', 'end': '2030-01-07T10:00:00',
+    })
+    rows = _rows(
+        main.supabase.table('Room Assignment').select('*')
+        .lt('start', '2030-01-14T00:00:00').gt('end', '2030-01-07T00:00:00')
+    )
+    assert [r['start'] for r in rows] == ['2030-01-07T09:00:00']
+
+
+def test_unsupported_operators_are_rejected(store):
+    with pytest.raises(APIError) as excinfo:
+        main.supabase.table('Room').select('*').ilike('building_id', 'b%').execute(fresh=True)
+    assert excinfo.value.code == 'PGRST100'
+    assert not main.is_transient_error(excinfo.value)
+
+
+def test_unsupported_params_are_rejected(client):
+    query = urllib.parse.urlencode({'select': '*', 'order': 'room_id.desc'})
+    resp = main.supabase._get().postgrest.session.get(f'/Room?{query}')
+    assert resp.status_code == 400
+    assert resp.json()['code'] == 'PGRST100'
+
+
+def test_unknown_table_is_a_permanent_error(store):
+    with pytest.raises(APIError) as excinfo:
+        main.supabase.table('Nope').select('*').execute(fresh=True)
+    assert excinfo.value.code == '42P01'
+    assert not main.is_transient_error(excinfo.value)
@@ -0,0 +1,212 @@
+import threading
+import time
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+import main
+from main import CircuitBreaker, CircuitOpenError, ResilientReads, is_transient_error
+
+
+def _transient():
+    return httpx.ConnectError('connection refused')
+
+
+def _rejected():
+    return APIError({'code': '42P01', 'message': 'relation "Nope" does not exist'})
+
+
+def _raise(exc):
+    def fn():
+        raise exc
+    return fn
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize('exc, expected', [
+    (httpx.ConnectError('refused'), True),
+    (httpx.ReadTimeout('slow'), True),
+    (APIError({'code': 'PGRST000', 'message': 'could not connect'}), True),
+    (APIError({'code': '57014', 'message': 'statement timeout'}), True),
+    (APIError({'code': 503, 'message': 'bad gateway'}), True),
+    (APIError({'message': 'no code'}), True),
+    (APIError({'code': '42P01', 'message': 'unknown table'}), False),
+    (APIError({'code': '23505', 'message': 'duplicate key'}), False),
+    (APIError({'code': 'PGRST116', 'message': 'no rows'}), False),
+    (APIError({'code': 404, 'message': 'not found'}), False),
+    (ValueError('bad input'), False),
+])
+def test_is_transient_error(exc, expected):
+    assert is_transient_error(exc) is expected
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert 0 < breaker.seconds_until_probe() <= 60
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    time.sleep(0.06)
+    assert breaker.state == 'half-open'
+    assert breaker.seconds_until_probe() == 0
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_fresh_read_is_remembered_and_returned_without_staleness():
+    reads = ResilientReads(retries=0)
+    assert reads.read('k', lambda: 'rows') == ('rows', None)
+
+
+def test_transient_failure_serves_last_good_snapshot():
+    reads = ResilientReads(retries=0)
+    reads.read('k', lambda: 'rows')
+    result, stale_since = reads.read('k', _raise(_transient()))
+    assert result == 'rows'
+    assert stale_since is not None
+    assert reads.stats['stale_served'] == 1
+
+
+def test_no_snapshot_means_the_error_is_raised():
+    reads = ResilientReads(retries=0)
+    with pytest.raises(httpx.ConnectError):
+        reads.read('k', _raise(_transient()))
+
+
+def test_allow_stale_false_raises_instead_of_serving_a_snapshot():
+    reads = ResilientReads(retries=0)
+    reads.read('k', lambda: 'rows')
+    with pytest.raises(httpx.ConnectError):
+        reads.read('k', _raise(_transient()), allow_stale=False)
+    assert reads.stats['stale_served'] == 0
+
+
+def test_rejected_query_is_not_retried_counted_or_answered_from_snapshot():
+    reads = ResilientReads(retries=3, backoff=0)
+    reads.read('k', lambda: 'rows')
+    with pytest.raises(APIError):
+        reads.read('k', _raise(_rejected()))
+    assert reads.stats['retries'] == 0
+    assert reads.stats['stale_served'] == 0
+    assert reads.breaker.failures == 0
+
+
+def test_transient_failures_are_retried():
+    reads = ResilientReads(retries=2, backoff=0)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _transient()
+        return 'rows'
+
+    assert reads.read('k', flaky) == ('rows', None)
+    assert reads.stats['retries'] == 2
+
+
+def test_open_breaker_serves_snapshot_without_calling():
+    reads = ResilientReads(retries=0)
+    reads.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    reads.read('k', lambda: 'rows')
+    reads.breaker.record_failure()
+    calls = []
+    result, stale_since = reads.read('k', lambda: calls.append(1))
+    assert result == 'rows' and stale_since is not None
+    assert calls == []
+    with pytest.raises(CircuitOpenError):
+        reads.read('other', lambda: 'rows')
+
+
+def test_stale_snapshot_is_revalidated_in_the_background():
+    reads = ResilientReads(retries=0)
+    reads.min_revalidation_delay = 0.05
+    reads.read('k', lambda: 'old rows')
+    recovered = threading.Event()
+
+    def read_after_recovery():
+        if not recovered.is_set():
+            raise _transient()
+        return 'new rows'
+
+    assert reads.read('k', read_after_recovery)[0] == 'old rows'
+    recovered.set()
+    _wait_for(lambda: not reads._pending)
+    assert reads._snapshots['k'][0] == 'new rows'
+    assert reads.stats['revalidations'] >= 1
+
+
+def test_revalidation_waits_for_the_half_open_window():
+    reads = ResilientReads(retries=0)
+    reads.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.3)
+    reads.read('k', lambda: 'old rows')
+    reads.breaker.record_failure()
+    calls = []
+
+    def fn():
+        calls.append(time.monotonic())
+        return 'new rows'
+
+    opened_at = reads.breaker.opened_at
+    reads.read('k', fn)
+    assert calls == []
+    _wait_for(lambda: calls)
+    assert calls[0] - opened_at >= 0.3
+    _wait_for(lambda: reads.breaker.state == 'closed')
+
+
+def test_table_reads_fall_back_to_snapshots_and_flag_the_page(store, monkeypatch):
+    main.supabase.resilience.retries = 0
+    with main.app.test_request_context():
+        fresh = main.supabase.table('Room').select('*').execute()
+        assert fresh.data
+
+    def down(*args, **kwargs):
+        raise RuntimeError('database down')
+    monkeypatch.setattr(store, 'select', down)
+
+    with main.app.test_request_context():
+        stale = main.supabase.table('Room').select('*').execute()
+        assert stale.data == fresh.data
+        assert main.g.stale_since is not None
+        with pytest.raises(httpx.TransportError):
+            main.supabase.table('Room').select('*').execute(fresh=True)
@@ -0,0 +1,81 @@
+import pytest
+
+from main import CourseSearchIndex
+
+
+def _ids(results):
+    return {c['course_id'] for c in results}
+
+
+@pytest.fixture
+def index(store):
+    index = CourseSearchIndex(refresh_seconds=3600)
+    index.refresh(force=True)
+    return index
+
+
+def test_prefix_and_compact_id_matching(index):
+    assert _ids(index.search('D1-101')) == {'D1-101'}
+    assert _ids(index.search('d1101')) == {'D1-101'}
+    assert _ids(index.search('depart 2 course')) >= {'D2-101', 'D2-108'}
+    assert index.search('nothing-like-this') == []
+    assert index.search('') == []
+
+
+def test_limit(index):
+    assert len(index.search('course', limit=5)) == 5
+    assert len(index.search('course')) == 48
+
+
+def test_unchanged_rows_are_not_reindexed(index):
+    assert index._load() == 0
+
+
+def test_only_changed_courses_are_reindexed(store, index):
+    section = next(s for s in store.tables['Section'] if s['course_id'] == 'D3-102')
+    section['instructor'] = 'Ada Lovelace'
+
+    assert index._load() == 1
+    assert _ids(index.search('lovelace')) == {'D3-102'}
+    # The old instructor's other courses are still indexed under their name.
+    assert 'D3-102' not in _ids(index.search('instructor 2'))
+    assert 'D4-102' in _ids(index.search('instructor 2'))
+
+
+def test_added_and_removed_courses(store, index):
+    store.insert('Course', {'course_id': 'D1-999', 'name': 'Compilers', 'department_id': 'D1'})
+    store.tables['Course'] = [c for c in store.tables['Course'] if c['course_id'] != 'D2-101']
+
+    assert index._load() == 2
+    assert _ids(index.search('compilers')) == {'D1-999'}
+    assert index.search('D2-101') == []
+    assert 'D2-101' not in index._docs
+    assert not any('D2-101' in ids for ids in index._postings.values())
+
+
+def test_refresh_waits_for_refresh_seconds(store, index):
+    store.insert('Course', {'course_id': 'D1-998', 'name': 'Databases', 'department_id': 'D1'})
+    assert index.search('databases') == []
+    index.refresh_seconds = 0
+    assert _ids(index.search('databases')) == {'D1-998'}
+
+
+@pytest.mark.parametrize('limit, expected', [('0', 1), ('-3', 1), ('4', 4), ('999', 48), ('abc', 10)])
+def test_autocomplete_limit_is_clamped(client, limit, expected):
+    resp = client.get(f'/student/autocomplete?q=course&limit={limit}')
+    assert resp.status_code == 200
+    assert len(resp.get_json()) == expected
+
+
+def test_instructor_search_only_shows_their_sections(store, client):
+    store.insert('Section', {'course_id': 'D1-101', 'instructor': 'Grace Hopper', 'term': 'F25'})
+    section_id = store.tables['Section'][-1]['section_id']
+    store.insert('Room Assignment', {
+        'room_id': 1, 'section_id': section_id, 'status': 'assigned',
+        'start': '2025-09-02T09:00', 'end': '2025-09-02T10:00',
+    })
+
+    page = client.get('/student?q=hopper').get_data(as_text=True)
+    # One header row plus the one section Hopper teaches.
+    assert page.count('<tr>') == 2
+    assert 'D1-101' in page
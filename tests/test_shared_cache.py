@@ -0,0 +1,88 @@
+import os
+import time
+
+import pytest
+
+import main
+from main import FileSharedCache, NullSharedCache, SharedCache
+
+
+def test_shared_cache_is_abstract():
+    with pytest.raises(TypeError):
+        SharedCache()
+
+    class Partial(SharedCache):
+        def get_version(self, table):
+            return ''
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_null_cache_stores_nothing():
+    cache = NullSharedCache()
+    cache.set('Room', cache.get_version('Room'), 'k', [1])
+    assert cache.get('Room', cache.get_version('Room'), 'k') is None
+
+
+def test_version_is_stable_until_bumped(tmp_path):
+    cache = FileSharedCache(str(tmp_path))
+    version = cache.get_version('Room Assignment')
+    assert version
+    assert cache.get_version('Room Assignment') == version
+    # Another worker sees the same token.
+    assert FileSharedCache(str(tmp_path)).get_version('Room Assignment') == version
+
+
+def test_bumps_give_unique_tokens(tmp_path):
+    cache = FileSharedCache(str(tmp_path))
+    versions = {cache.bump_version('Room') for _ in range(20)}
+    assert len(versions) == 20
+
+
+def test_entries_are_scoped_to_a_version(tmp_path):
+    cache = FileSharedCache(str(tmp_path))
+    old = cache.get_version('Room')
+    cache.set('Room', old, 'k', [{'room_id': 1}])
+    assert cache.get('Room', old, 'k') == [{'room_id': 1}]
+    assert cache.get('Room', old, 'other') is None
+
+    new = cache.bump_version('Room')
+    assert cache.get('Room', new, 'k') is None
+    assert cache.get('Room', old, 'k') is None
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.json')]
+
+
+def test_bumping_one_table_leaves_others_alone(tmp_path):
+    cache = FileSharedCache(str(tmp_path))
+    version = cache.get_version('Course')
+    cache.set('Course', version, 'k', [1])
+    cache.bump_version('Room')
+    assert cache.get_version('Course') == version
+    assert cache.get('Course', version, 'k') == [1]
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = FileSharedCache(str(tmp_path), ttl=0.05)
+    version = cache.get_version('Room')
+    cache.set('Room', version, 'k', [1])
+    assert cache.get('Room', version, 'k') == [1]
+    time.sleep(0.1)
+    assert cache.get('Room', version, 'k') is None
+
+
+def test_writes_through_the_app_invalidate_reads(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(main.supabase, 'shared_cache', FileSharedCache(str(tmp_path)))
+
+    def room_count(**kwargs):
+        return len(main.supabase.table('Room').select('*').execute(**kwargs).data)
+
+    before = room_count()
+    # Edits made straight in the database don't bump the version...
+    store.insert('Room', {'building_id': 'B1', 'room_num': '999'})
+    assert room_count() == before
+    # ...but write-path reads skip the cache.
+    assert room_count(fresh=True) == before + 1
+
+    main.supabase.table('Room').insert({'building_id': 'B1', 'room_num': '998'}).execute()
+    assert room_count() == before + 2
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from main import SingleFlight
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def _run_concurrently(flight, key, fn, n):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {'rows': [1, 2, 3]}
+
+    threads, results, errors = _run_concurrently(flight, ('Room', 'select'), fn, 8)
+    _wait_for(lambda: flight.stats['calls'] == 8)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == [1]
+    assert errors == []
+    assert len(results) == 8
+    assert all(r is results[0] for r in results)
+    assert flight.stats == {'calls': 8, 'executed': 1, 'coalesced': 7}
+
+
+def test_waiters_get_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise RuntimeError('backend down')
+
+    threads, results, errors = _run_concurrently(flight, 'k', fn, 4)
+    _wait_for(lambda: flight.stats['calls'] == 4)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert results == []
+    assert len(errors) == 4
+    assert all(isinstance(e, RuntimeError) for e in errors)
+
+
+def test_nothing_is_kept_after_the_call_finishes():
+    flight = SingleFlight()
+    values = iter([1, 2])
+
+    assert flight.do('k', lambda: next(values)) == 1
+    assert flight.do('k', lambda: next(values)) == 2
+    assert flight.stats['executed'] == 2
+
+    with pytest.raises(ValueError):
+        flight.do('k', lambda: int('x'))
+    assert flight.do('k', lambda: 3) == 3
+
+
+def test_different_keys_do_not_wait_on_each_other():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    threads, _, _ = _run_concurrently(flight, 'slow', lambda: release.wait(5), 1)
+    _wait_for(lambda: flight.stats['calls'] == 1)
+
+    assert flight.do('fast', lambda: 'done') == 'done'
+    assert flight.stats['coalesced'] == 0
+    release.set()
+    for t in threads:
+        t.join()
+
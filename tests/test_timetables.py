@@ -0,0 +1,231 @@
+import os
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+import pytest
+
+import main
+from main import TimetableSnapshots, _week_window
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def _today_at(hour):
+    return datetime.combine(date.today(), dtime(hour))
+
+
+def _assign(store, room_id, start_hour, section_id=1, hours=1):
+    start = _today_at(start_hour)
+    return store.insert('Room Assignment', {
+        'room_id': room_id, 'section_id': section_id, 'status': 'assigned',
+        'start': start.isoformat(), 'end': (start + timedelta(hours=hours)).isoformat(),
+    })
+
+
+def _uid(row):
+    return f"UID:assignment-{row['assignment_id']}@"
+
+
+def _read(fmt, name):
+    with open(os.path.join(main.TIMETABLE_DIR, f'{name}.{fmt}')) as f:
+        return f.read()
+
+
+def _mark_as_last_week(name):
+    stamp = time.time_ns() - 8 * 24 * 3600 * 10 ** 9
+    for fmt in TimetableSnapshots.FORMATS:
+        os.utime(os.path.join(main.TIMETABLE_DIR, f'{name}.{fmt}'), ns=(stamp, stamp))
+
+
+@pytest.fixture
+def assignment_reads(store, monkeypatch):
+    reads = []
+    select = store.select
+
+    def counting(table, columns, filters):
+        if table == 'Room Assignment':
+            reads.append(filters)
+        return select(table, columns, filters)
+    monkeypatch.setattr(store, 'select', counting)
+    return reads
+
+
+@pytest.fixture
+def backend_down(store, monkeypatch):
+    """Call it to make every read fail; returns the list of failed reads."""
+    failed = []
+
+    def down():
+        def fail(table, columns, filters):
+            failed.append(table)
+            raise RuntimeError('database down')
+        monkeypatch.setattr(store, 'select', fail)
+        main.supabase.resilience.retries = 0
+        return failed
+    return down
+
+
+@pytest.mark.parametrize('now, expected_start', [
+    (datetime(2026, 10, 21, 15, 30), datetime(2026, 10, 19)),
+    (datetime(2026, 10, 19, 0, 0), datetime(2026, 10, 19)),
+    (datetime(2026, 10, 25, 23, 59), datetime(2026, 10, 19)),
+    (datetime(2027, 1, 1, 12, 0), datetime(2026, 12, 28)),
+])
+def test_week_window_is_monday_to_monday(now, expected_start):
+    assert _week_window(now) == (expected_start, expected_start + timedelta(days=7))
+
+
+def test_filename_sanitizes_keys():
+    assert TimetableSnapshots.filename('room', 'ENG 101/a', 'ics') == 'room-ENG_101_a.ics'
+
+
+def test_resolve_maps_sanitized_keys_back_to_real_ids(store):
+    store.insert('Building', {'building_id': 'Old Main', 'name': 'Old Main'})
+    assert main.timetables.resolve('building', 'Old_Main') == 'Old Main'
+    assert main.timetables.resolve('building', 'Old Main') == 'Old Main'
+    assert main.timetables.resolve('department', 'D3') == 'D3'
+    assert main.timetables.resolve('room', '1') == '1'
+    assert main.timetables.resolve('room', '9999') is None
+    assert main.timetables.resolve('department', 'Old_Main') is None
+
+
+def test_snapshot_only_covers_this_week(store, client):
+    this_week = _assign(store, 1, 8)
+    page = client.get('/timetables/room-1.html')
+    assert page.status_code == 200
+    assert page.mimetype == 'text/html'
+    assert 'Week of' in page.get_data(as_text=True)
+
+    ics = client.get('/timetables/room-1.ics').get_data(as_text=True)
+    # The seeded assignments are all in September 2025.
+    assert ics.count('BEGIN:VEVENT') == 1
+    assert _uid(this_week) in ics
+
+
+def test_snapshot_for_a_key_with_spaces(store, client):
+    store.insert('Room', {'building_id': 'Old Main', 'room_num': '1'})
+    room_id = store.tables['Room'][-1]['room_id']
+    row = _assign(store, room_id, 9)
+    resp = client.get('/timetables/building-Old_Main.ics')
+    assert resp.status_code == 200
+    assert _uid(row) in resp.get_data(as_text=True)
+    assert os.path.exists(os.path.join(main.TIMETABLE_DIR, 'building-Old_Main.html'))
+
+
+@pytest.mark.parametrize('name', ['room-9999.html', 'hall-1.html', 'room-1.pdf', 'room-.html', 'room1'])
+def test_unknown_names_404_without_loading_assignments(client, assignment_reads, name):
+    assert client.get(f'/timetables/{name}').status_code == 404
+    assert assignment_reads == []
+
+
+def test_current_snapshot_is_served_from_disk(store, client, assignment_reads):
+    client.get('/timetables/room-1.html')
+    assignment_reads.clear()
+    assert client.get('/timetables/room-1.html').status_code == 200
+    assert assignment_reads == []
+
+
+def test_snapshots_older_than_max_age_are_rebuilt(store, client, assignment_reads, monkeypatch):
+    client.get('/timetables/room-1.ics')
+    # Edited straight in the database, so nothing refreshes the snapshot.
+    row = _assign(store, 1, 10)
+    assert _uid(row) not in client.get('/timetables/room-1.ics').get_data(as_text=True)
+
+    monkeypatch.setattr(main.timetables, 'max_age', 0)
+    assert _uid(row) in client.get('/timetables/room-1.ics').get_data(as_text=True)
+
+
+def test_last_weeks_snapshot_is_rebuilt(store, client):
+    client.get('/timetables/room-1.ics')
+    _mark_as_last_week('room-1')
+    assert not main.timetables.is_current('room', '1', 'ics')
+    client.get('/timetables/room-1.ics')
+    assert main.timetables.is_current('room', '1', 'ics')
+
+
+def test_backend_failure_serves_the_old_copy(store, client, backend_down):
+    row = _assign(store, 1, 8)
+    client.get('/timetables/room-1.ics')
+    _mark_as_last_week('room-1')
+    backend_down()
+    resp = client.get('/timetables/room-1.ics')
+    assert resp.status_code == 200
+    assert _uid(row) in resp.get_data(as_text=True)
+
+
+def test_backend_failure_without_a_copy_is_503(store, client, backend_down):
+    backend_down()
+    assert client.get('/timetables/room-1.html').status_code == 503
+
+
+def test_write_never_replaces_newer_data(store):
+    snapshots = main.timetables
+    os.makedirs(snapshots.directory, exist_ok=True)
+    week_start, _ = _week_window()
+    entry = {
+        'assignment_id': 1, 'room_id': 1, 'building_id': 'B1', 'room_num': '101', 'dept_id': 'D1',
+        'course_id': 'D1-101', 'course_name': 'Course D1-101', 'section_id': 1,
+        'instructor': 'Instructor 1', 'start': _today_at(8).isoformat(), 'end': _today_at(9).isoformat(),
+    }
+    stamp = time.time_ns()
+
+    assert snapshots._write('room', '1', [entry], week_start, stamp)
+    assert os.stat(snapshots.path('room', '1', 'html')).st_mtime_ns == stamp
+    # Rows read earlier (a slower worker) lose, even though they finish later.
+    assert not snapshots._write('room', '1', [], week_start, stamp - 1)
+    assert 'UID:assignment-1@' in _read('ics', 'room-1')
+    assert snapshots._write('room', '1', [], week_start, stamp + 1)
+    assert 'UID:assignment-1@' not in _read('ics', 'room-1')
+
+
+def test_concurrent_writes_keep_the_newest(store):
+    snapshots = main.timetables
+    os.makedirs(snapshots.directory, exist_ok=True)
+    week_start, _ = _week_window()
+    stamps = [time.time_ns() + i for i in range(8)]
+    threads = [
+        threading.Thread(target=snapshots._write, args=('room', '1', [], week_start, stamp))
+        for stamp in reversed(stamps)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for fmt in TimetableSnapshots.FORMATS:
+        assert os.stat(snapshots.path('room', '1', fmt)).st_mtime_ns == stamps[-1]
+
+
+def test_update_assignment_rewrites_old_and_new_room(store, client):
+    row = _assign(store, 1, 8)
+    for name in ('room-1.ics', 'room-2.ics'):
+        client.get(f'/timetables/{name}')
+    assert _uid(row) in _read('ics', 'room-1')
+
+    client.post('/login', data={'role': 'admin', 'password': 'admin'})
+    resp = client.post(f"/admin/assignment/{row['assignment_id']}", data={
+        'room_id': '2', 'start': row['start'], 'end': row['end'],
+    })
+    assert 'error' not in resp.headers['Location']
+
+    _wait_for(lambda: _uid(row) in _read('ics', 'room-2'))
+    _wait_for(lambda: _uid(row) not in _read('ics', 'room-1'))
+
+
+def test_refresh_skips_the_write_when_the_backend_fails(store, client, backend_down, monkeypatch):
+    row = _assign(store, 1, 8)
+    client.get('/timetables/room-1.ics')
+    before = os.stat(main.timetables.path('room', '1', 'ics')).st_mtime_ns
+    monkeypatch.setattr(main.timetables, 'RETRY_DELAY', 3600)
+    failed = backend_down()
+
+    main.timetables.refresh_for_assignments([row])
+    # The drain takes the queue while it runs and puts it back when the read fails.
+    _wait_for(lambda: failed and main.timetables._pending)
+    assert main.timetables._pending == {(1, row['section_id'])}
+    assert os.stat(main.timetables.path('room', '1', 'ics')).st_mtime_ns == before
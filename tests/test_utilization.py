@@ -0,0 +1,203 @@
+from datetime import datetime
+
+import pytest
+
+import main
+from main import FileSharedCache, UtilizationRollup, _hour_chunks
+
+
+@pytest.fixture
+def rollup():
+    """A rollup with its lookups filled in by hand, so nothing hits the backend."""
+    rollup = UtilizationRollup(max_age=3600)
+    rollup._room_building = {1: 'B1', 2: 'B2'}
+    rollup._section_dept = {10: 'D1', 20: 'D2'}
+    rollup.ready = True
+    return rollup
+
+
+@pytest.fixture
+def shared_cache(store, tmp_path, monkeypatch):
+    cache = FileSharedCache(str(tmp_path / 'cache'))
+    monkeypatch.setattr(main.supabase, 'shared_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def full_reads(store, monkeypatch):
+    """Tables read with no filter at all, in order."""
+    reads = []
+    select = store.select
+
+    def counting(table, columns, filters):
+        if not filters:
+            reads.append(table)
+        return select(table, columns, filters)
+    monkeypatch.setattr(store, 'select', counting)
+    return reads
+
+
+def _booked(rollup, scope, key, period='day'):
+    entry = rollup.totals[scope].get(key)
+    return {b: m for b, m in entry['booked_' + period].items() if m} if entry else {}
+
+
+def _login_admin(client):
+    client.post('/login', data={'role': 'admin', 'password': 'admin'})
+
+
+def test_hour_chunks_split_on_hour_boundaries():
+    chunks = list(_hour_chunks(datetime(2025, 9, 2, 9, 30), datetime(2025, 9, 2, 11, 15)))
+    assert chunks == [
+        (datetime(2025, 9, 2, 9, 30), 30),
+        (datetime(2025, 9, 2, 10, 0), 60),
+        (datetime(2025, 9, 2, 11, 0), 15),
+    ]
+    assert list(_hour_chunks(datetime(2025, 9, 2, 9), datetime(2025, 9, 2, 9))) == []
+
+
+def test_chunks_cross_midnight_and_iso_week():
+    # Sunday night into Monday morning.
+    assert UtilizationRollup._chunks('2025-09-07T23:30', '2025-09-08T00:45') == [
+        ('2025-09-07', '2025-W36', 23, 30),
+        ('2025-09-08', '2025-W37', 0, 45),
+    ]
+
+
+def test_chunks_cross_iso_year():
+    # 2024-12-30 is a Monday in ISO week 1 of 2025.
+    weeks = [week for _, week, _, _ in UtilizationRollup._chunks('2024-12-29 23:00:00', '2024-12-30 01:00:00')]
+    assert weeks == ['2024-W52', '2025-W01']
+
+
+@pytest.mark.parametrize('start, end', [
+    ('2025-09-02T10:00', '2025-09-02T09:00'),
+    ('2025-09-02T10:00', '2025-09-02T10:00'),
+    (None, '2025-09-02T10:00'),
+    ('not a date', '2025-09-02T10:00'),
+])
+def test_chunks_ignore_empty_or_unreadable_ranges(start, end):
+    assert UtilizationRollup._chunks(start, end) == []
+
+
+def test_assignment_counts_toward_room_building_and_department(rollup):
+    rollup._record_assignment({
+        'assignment_id': 1, 'room_id': 1, 'section_id': 10,
+        'start': '2025-09-02T09:30', 'end': '2025-09-02T11:00',
+    })
+    for scope, key in (('room', '1'), ('building', 'B1'), ('department', 'D1')):
+        assert _booked(rollup, scope, key) == {'2025-09-02': 90}
+        assert _booked(rollup, scope, key, 'week') == {'2025-W36': 90}
+    assert rollup.totals['room']['1']['peak_hours'][9:11] == [30, 60]
+
+
+def test_moving_an_assignment_backs_out_the_old_totals(rollup):
+    rollup._record_assignment({
+        'assignment_id': 1, 'room_id': 1, 'section_id': 10,
+        'start': '2025-09-02T09:00', 'end': '2025-09-02T10:00',
+    })
+    rollup._record_assignment({
+        'assignment_id': 1, 'room_id': 2,
+        'start': '2025-09-03T14:00', 'end': '2025-09-03T16:00',
+    })
+    assert _booked(rollup, 'room', '1') == {}
+    assert _booked(rollup, 'building', 'B1') == {}
+    assert _booked(rollup, 'room', '2') == {'2025-09-03': 120}
+    assert _booked(rollup, 'building', 'B2') == {'2025-09-03': 120}
+    # The update payload had no section_id, so the department is kept.
+    assert _booked(rollup, 'department', 'D1') == {'2025-09-03': 120}
+    assert rollup.totals['room']['1']['peak_hours'][9] == 0
+
+
+def test_partial_update_keeps_unsent_columns(rollup):
+    rollup._record_assignment({
+        'assignment_id': 1, 'room_id': 1, 'section_id': 20,
+        'start': '2025-09-02T09:00', 'end': '2025-09-02T10:00',
+    })
+    rollup._record_assignment({'assignment_id': 1, 'room_id': None, 'end': '2025-09-02T10:30'})
+    assert _booked(rollup, 'room', '1') == {'2025-09-02': 90}
+    assert _booked(rollup, 'department', 'D2') == {'2025-09-02': 90}
+
+
+def test_blackouts_are_counted_separately(rollup):
+    rollup._record_blackout({'room_id': 1, 'start': '2025-09-02T12:00', 'end': '2025-09-02T13:00'})
+    entry = rollup.totals['room']['1']
+    assert dict(entry['blackout_day']) == {'2025-09-02': 60}
+    assert _booked(rollup, 'room', '1') == {}
+    assert entry['peak_hours'] == [0] * 24
+
+
+def test_report_matches_a_fresh_build(store, shared_cache):
+    rows = main.utilization.report('room', 'week')
+    assert sum(r['booked_total'] for r in rows) > 0
+    rebuilt = UtilizationRollup().report('room', 'week')
+    assert rows == rebuilt
+
+
+def test_report_only_rebuilds_when_the_tables_change(shared_cache, full_reads):
+    main.utilization.report('room')
+    assert sorted(full_reads) == ['Blackout Hours', 'Course', 'Room', 'Room Assignment', 'Section']
+    full_reads.clear()
+    main.utilization.report('room')
+    assert full_reads == []
+
+
+def test_own_writes_are_folded_in_without_a_rebuild(store, shared_cache, full_reads, client):
+    before = {r['key']: r['booked_total'] for r in main.utilization.report('room')}
+    _login_admin(client)
+
+    resp = client.post('/admin/assign/1', data={'room_id': '1'})
+    assert 'error' not in resp.headers['Location']
+    resp = client.post('/admin/blackout', data={
+        'room_id': '1', 'blackout_start': '2025-09-20T08:00', 'blackout_end': '2025-09-20T09:00', 'reason': 'test',
+    })
+    assert resp.status_code == 302
+
+    full_reads.clear()
+    rows = {r['key']: r for r in main.utilization.report('room')}
+    assert 'Room Assignment' not in full_reads and 'Blackout Hours' not in full_reads
+    assert rows['1']['booked_total'] == before.get('1', 0) + 75
+    assert rows['1']['blackout_total'] == 60
+
+
+def test_moving_an_assignment_through_the_app(store, shared_cache, full_reads, client):
+    main.utilization.report('room')
+    moved = store.tables['Room Assignment'][0]
+    old_room = str(moved['room_id'])
+    old_minutes = main.utilization.report('room', key=old_room)[0]['booked_total']
+    _login_admin(client)
+
+    resp = client.post(f"/admin/assignment/{moved['assignment_id']}", data={
+        'room_id': '40', 'start': '2025-10-01T07:00', 'end': '2025-10-01T08:00',
+    })
+    assert 'error' not in resp.headers['Location']
+
+    full_reads.clear()
+    old_row = main.utilization.report('room', key=old_room)
+    assert 'Room Assignment' not in full_reads
+    assert old_row[0]['booked_total'] < old_minutes
+    assert main.utilization.report('room', key='40')[0]['booked']['2025-10-01'] == 60
+
+
+def test_other_workers_writes_trigger_a_rebuild(store, shared_cache, full_reads):
+    main.utilization.report('room')
+    store.insert('Room Assignment', {
+        'room_id': 1, 'section_id': 1, 'status': 'assigned',
+        'start': '2025-11-03T08:00', 'end': '2025-11-03T09:00',
+    })
+    # What another worker's write through TableQuery leaves behind.
+    FileSharedCache(shared_cache.directory).bump_version('Room Assignment')
+
+    full_reads.clear()
+    rows = main.utilization.report('room', key='1')
+    assert 'Room Assignment' in full_reads
+    assert rows[0]['booked']['2025-11-03'] == 60
+
+
+def test_max_age_rebuilds_even_without_a_token_change(store, full_reads, monkeypatch):
+    # The default test backend has no versions at all, like edits made in Supabase.
+    monkeypatch.setattr(main, 'utilization', UtilizationRollup(max_age=0))
+    main.utilization.report('room')
+    full_reads.clear()
+    main.utilization.report('room')
+    assert 'Room Assignment' in full_reads